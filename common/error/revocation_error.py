@@ -0,0 +1,9 @@
+class InvalidRevocationEntryError(Exception):
+    """
+    Credentials whose revocation entry can't be applied, e.g. a status list
+    index out of the list. Answered with a 400 and nothing is revoked.
+    """
+
+    def __init__(self, vc_ids):
+        self.vc_ids = vc_ids
+        super().__init__(f"Invalid revocation entry of {', '.join(vc_ids)}")
@@ -0,0 +1,11 @@
+class UpstreamUnavailableError(Exception):
+    """
+    An upstream service is not called because its circuit is open or it has
+    too many calls in flight. Answered with a 503 and ``Retry-After``.
+    """
+
+    def __init__(self, *, upstream, retry_after, reason):
+        self.upstream = upstream
+        self.retry_after = retry_after
+        self.reason = reason
+        super().__init__(f"Upstream {upstream} unavailable ({reason})")
@@ -0,0 +1,73 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+
+from common.utils.metrics_utils import (
+    REQUEST_DB_QUERIES,
+    REQUEST_LATENCY,
+    install_query_counter,
+    start_query_count,
+    stop_query_count,
+)
+
+UNMATCHED_VIEW = "unmatched"
+
+
+def view_label(request) -> str:
+    """
+    Name of the view that served the request, ``<ViewSet>.<action>`` for DRF
+    viewsets, so every action gets its own series.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNMATCHED_VIEW
+    view_class = getattr(match.func, "cls", None)
+    if view_class is None:
+        return match.view_name or match.func.__name__
+    actions = getattr(match.func, "actions", None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f"{view_class.__name__}.{action}"
+
+
+class MetricsMiddleware:
+    """Records the latency and database queries of every request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(install_query_counter, dispatch_uid="metrics_query_counter")
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        counter, token = start_query_count()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_query_count(token)
+        self.observe(request, response, start, counter[0])
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        counter, token = start_query_count()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_query_count(token)
+        self.observe(request, response, start, counter[0])
+        return response
+
+    @staticmethod
+    def observe(request, response, start: float, queries: int) -> None:
+        view = view_label(request)
+        REQUEST_LATENCY.labels(view, request.method, f"{response.status_code // 100}xx").observe(
+            time.perf_counter() - start
+        )
+        REQUEST_DB_QUERIES.labels(view).observe(queries)
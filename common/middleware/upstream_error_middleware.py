@@ -0,0 +1,33 @@
+from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from common.error.upstream_error import UpstreamUnavailableError
+
+
+def find_upstream_error(exception: BaseException) -> UpstreamUnavailableError | None:
+    """
+    Returns the UpstreamUnavailableError behind ``exception``, also when a
+    service re-raised it wrapped in another exception.
+    """
+    seen = set()
+    while exception is not None and id(exception) not in seen:
+        if isinstance(exception, UpstreamUnavailableError):
+            return exception
+        seen.add(id(exception))
+        exception = exception.__cause__ or exception.__context__
+    return None
+
+
+class UpstreamErrorMiddleware(MiddlewareMixin):
+    """Answers the requests failed by an unavailable upstream with a 503."""
+
+    def process_exception(self, request, exception):
+        error = find_upstream_error(exception)
+        if error is None:
+            return None
+        response = JsonResponse(
+            {"detail": f"The {error.upstream} service is temporarily unavailable"},
+            status=503,
+        )
+        response["Retry-After"] = str(error.retry_after)
+        return response
@@ -0,0 +1,139 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from common.error.upstream_error import UpstreamUnavailableError
+from common.utils.metrics_utils import UPSTREAM_REJECTIONS, track_upstream
+from project import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Retry-After (seconds) of the calls rejected because the upstream is busy
+BULKHEAD_RETRY_AFTER = 1
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker and bulkhead of one upstream service, in this process.
+
+    After ``failure_threshold`` consecutive failures (errors or 5xx) the
+    circuit opens and calls are rejected for ``reset_timeout`` seconds. Then
+    a single probe call is let through: the circuit closes if it succeeds and
+    opens again if it fails. At most ``max_concurrency`` calls (0 for no
+    limit) may be in flight at once, the next ones are rejected straight away
+    instead of queueing behind a slow upstream.
+    """
+
+    def __init__(
+        self,
+        upstream: str,
+        failure_threshold: int,
+        reset_timeout: float,
+        max_concurrency: int,
+    ):
+        self.upstream = upstream
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_concurrency = max_concurrency
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Admits a call or raises UpstreamUnavailableError."""
+        with self._lock:
+            probe = False
+            if self.state == OPEN:
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    self._reject(OPEN, remaining)
+                self.state = HALF_OPEN
+                self.probing = False
+            if self.state == HALF_OPEN:
+                if self.probing:
+                    self._reject(HALF_OPEN, self.reset_timeout)
+                self.probing = probe = True
+            if self.max_concurrency and self.in_flight >= self.max_concurrency:
+                if probe:
+                    self.probing = False
+                self._reject("bulkhead", BULKHEAD_RETRY_AFTER)
+            self.in_flight += 1
+
+    def release(self, failed: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.failures += 1
+                if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                    self.state = OPEN
+                    self.opened_at = time.monotonic()
+                    self.probing = False
+            else:
+                self.failures = 0
+                if self.state == HALF_OPEN:
+                    self.state = CLOSED
+                    self.probing = False
+
+    def _reject(self, reason: str, retry_after: float):
+        UPSTREAM_REJECTIONS.labels(self.upstream, reason).inc()
+        raise UpstreamUnavailableError(
+            upstream=self.upstream,
+            retry_after=max(math.ceil(retry_after), 1),
+            reason=reason,
+        )
+
+
+_breakers: dict = {}
+_pid: int = None
+_lock = threading.Lock()
+
+
+def circuit_breaker(upstream: str) -> CircuitBreaker:
+    global _breakers, _pid
+    pid = os.getpid()
+    if _pid != pid:
+        # A forked worker starts with closed circuits and nothing in flight
+        with _lock:
+            if _pid != pid:
+                _breakers = {}
+                _pid = pid
+    breaker = _breakers.get(upstream)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.get(upstream)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    upstream,
+                    settings.UPSTREAM_CIRCUIT_FAILURE_THRESHOLD,
+                    settings.UPSTREAM_CIRCUIT_RESET_TIMEOUT,
+                    settings.UPSTREAM_MAX_CONCURRENCY_OVERRIDES.get(
+                        upstream, settings.UPSTREAM_MAX_CONCURRENCY
+                    ),
+                )
+                _breakers[upstream] = breaker
+    return breaker
+
+
+@contextmanager
+def guarded_call(upstream: str, operation: str):
+    """
+    Calls an upstream through its circuit breaker and measures it (see
+    ``track_upstream``). Raises UpstreamUnavailableError without calling it
+    when the circuit is open or too many calls are in flight.
+    """
+    breaker = circuit_breaker(upstream)
+    breaker.acquire()
+    failed = True
+    try:
+        with track_upstream(upstream, operation) as call:
+            yield call
+        failed = call.failed
+    finally:
+        breaker.release(failed)
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import json
+import threading
+from abc import ABC, abstractmethod
+from typing import Any
+
+from django.utils.module_loading import import_string
+
+from common.services.http_client import ENTITY, HttpClient
+from common.utils.entity_auth_credentials import EntityAuthCredentials
+from common.utils.entity_auth_utils import (
+    add_entity_auth_headers,
+    invalidate_bearer_token,
+)
+from project import settings
+
+
+class EntityConnector(ABC):
+    """
+    Every interaction with the entity (Authentic Source) of the deployment.
+
+    Responses are dicts with ``status_code`` and ``content``. Another
+    implementation can be plugged in with ``ENTITY_CONNECTOR_CLASS``.
+    """
+
+    @abstractmethod
+    def get_external_data(self, vc_type: str, user_id: str | None, pin: str | None) -> dict:
+        """Claims of the credential of type ``vc_type`` for the user."""
+
+    @abstractmethod
+    def register_deferred(self, payload: dict) -> dict: ...
+
+    @abstractmethod
+    def exchange_deferred(self, code: str) -> dict: ...
+
+    @abstractmethod
+    def validate_claims(self, data: Any) -> Any:
+        """Validation of the claims of a presentation, as returned by the entity."""
+
+    @abstractmethod
+    def notify_issued(self, payloads: list[dict]) -> list[str | None]:
+        """
+        Notifies the entity of issued credentials. Returns the error of each
+        notification, None for the delivered ones.
+        """
+
+
+class HttpEntityConnector(EntityConnector):
+    """
+    Connector to the entity API at ``ENTITY_URL``.
+
+    Calls share the pooled ``HttpClient`` sessions and timeouts, are measured
+    per operation and authenticated with ``ENTITY_API_KEY`` and/or
+    ``ENTITY_AUTH`` (see ``add_entity_auth_headers``). A rejected OAuth2 token
+    is dropped and the call is retried once with a new one.
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        auth: str | None = None,
+        verify: bool | None = None,
+    ):
+        self.url = settings.ENTITY_URL if url is None else url
+        self.auth = (settings.ENTITY_AUTH or None) if auth is None else auth
+        self.verify = settings.ENTITY_VERIFY_SSL if verify is None else verify
+
+    def headers(self) -> dict:
+        headers = {}
+        if settings.ENTITY_API_KEY:
+            headers = {"X-API-KEY": settings.ENTITY_API_KEY}
+        return add_entity_auth_headers(headers, self.auth)
+
+    def request(self, method: str, path: str, operation: str, **kwargs):
+        response = self._send(method, path, operation, **kwargs)
+        if response.status_code == 401 and self.auth:
+            credentials = EntityAuthCredentials.from_input(self.auth)
+            if credentials.is_oauth2_valid() and not credentials.is_api_key_valid():
+                invalidate_bearer_token(credentials.token_url, credentials.client_id)
+                response = self._send(method, path, operation, **kwargs)
+        return response
+
+    def _send(self, method: str, path: str, operation: str, **kwargs):
+        return HttpClient.request(
+            method,
+            self.url + path,
+            upstream=ENTITY,
+            operation=operation,
+            headers=self.headers(),
+            verify=self.verify,
+            **kwargs,
+        )
+
+    def get_external_data(self, vc_type: str, user_id: str | None, pin: str | None) -> dict:
+        response = self.request(
+            "GET",
+            "/credentials/external-data",
+            "external_data",
+            params={"vc_type": vc_type, "user_id": user_id, "pin": pin},
+        )
+        return {
+            "status_code": response.status_code,
+            "content": json.loads(response.content.decode("utf-8")),
+        }
+
+    def register_deferred(self, payload: dict) -> dict:
+        response = self.request("POST", "/deferred/registry", "register_deferred", json=payload)
+        return {
+            "status_code": response.status_code,
+            "content": response.content.decode("utf-8"),
+        }
+
+    def exchange_deferred(self, code: str) -> dict:
+        response = self.request("GET", "/deferred/exchange/" + code, "exchange_deferred")
+        return {
+            "status_code": response.status_code,
+            "content": json.loads(response.content.decode("utf-8")),
+        }
+
+    def validate_claims(self, data: Any) -> Any:
+        response = self.request(
+            "POST", "/presentations/external-data", "validate_claims", json=data
+        )
+        return json.loads(response.content.decode("utf-8"))
+
+    def notify_issued(self, payloads: list[dict]) -> list[str | None]:
+        if settings.ENTITY_NOTIFICATION_BATCH_PATH:
+            # One request for the whole batch, delivered or failed as a whole
+            try:
+                response = self.request(
+                    "POST",
+                    settings.ENTITY_NOTIFICATION_BATCH_PATH,
+                    "notify_issued_batch",
+                    json=payloads,
+                )
+                response.raise_for_status()
+            except Exception as e:
+                return [str(e)] * len(payloads)
+            return [None] * len(payloads)
+
+        errors = []
+        for payload in payloads:
+            try:
+                response = self.request(
+                    "POST", "/credentials/external-data", "notify_issued", json=payload
+                )
+                response.raise_for_status()
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            errors.append(None)
+        return errors
+
+
+class MockEntityConnector(EntityConnector):
+    """Empty answers, for development without an entity (DEVELOPER_MOCKUP_ENTITIES)."""
+
+    def get_external_data(self, vc_type: str, user_id: str | None, pin: str | None) -> dict:
+        return {"status_code": 200, "content": {}}
+
+    def register_deferred(self, payload: dict) -> dict:
+        return {"status_code": 200, "content": "DEV_CODE"}
+
+    def exchange_deferred(self, code: str) -> dict:
+        return {"status_code": 200, "content": {"data": {}}}
+
+    def validate_claims(self, data: Any) -> Any:
+        return {"verified": True}
+
+    def notify_issued(self, payloads: list[dict]) -> list[str | None]:
+        return [None] * len(payloads)
+
+
+_connector: EntityConnector = None
+_connector_lock = threading.Lock()
+
+
+def get_entity_connector() -> EntityConnector:
+    """
+    Returns the connector of ``ENTITY_CONNECTOR_CLASS`` if set, otherwise the
+    mock one when there is no ``ENTITY_URL`` and DEVELOPER_MOCKUP_ENTITIES is
+    on, or the HTTP one.
+    """
+    global _connector
+    if _connector is None:
+        with _connector_lock:
+            if _connector is None:
+                if settings.ENTITY_CONNECTOR_CLASS:
+                    connector_class = import_string(settings.ENTITY_CONNECTOR_CLASS)
+                elif not settings.ENTITY_URL and settings.DEVELOPER_MOCKUP_ENTITIES:
+                    connector_class = MockEntityConnector
+                else:
+                    connector_class = HttpEntityConnector
+                _connector = connector_class()
+    return _connector
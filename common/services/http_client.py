@@ -0,0 +1,164 @@
+import asyncio
+import os
+import threading
+import weakref
+from http.cookiejar import DefaultCookiePolicy
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from common.services.circuit_breaker import guarded_call
+from common.utils.sentry_utils import span
+from project import settings
+
+VC_SERVICE = "vc_service"
+ENTITY = "entity"
+ENTITY_AUTH = "entity_auth"
+EBSI_DIDR = "ebsi_didr"
+EBSI_TIR = "ebsi_tir"
+
+
+class HttpClient:
+    """
+    Shared HTTP client for upstream services.
+
+    Keeps one pooled, keep-alive ``requests.Session`` per upstream and per
+    process, so consecutive calls reuse the TCP/TLS connections instead of
+    opening a new one on every request. Every call gets the configured
+    connect/read timeouts unless the caller provides its own, goes through the
+    circuit breaker of its upstream and is measured per upstream and
+    ``operation`` (the HTTP method unless given).
+    """
+
+    _sessions: dict = {}
+    _pid: int = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def session(upstream: str = VC_SERVICE) -> requests.Session:
+        pid = os.getpid()
+        if HttpClient._pid != pid:
+            # Pools must not be shared with a forked parent (e.g. Celery prefork)
+            with HttpClient._lock:
+                if HttpClient._pid != pid:
+                    HttpClient._sessions = {}
+                    HttpClient._pid = pid
+        session = HttpClient._sessions.get(upstream)
+        if session is None:
+            with HttpClient._lock:
+                session = HttpClient._sessions.get(upstream)
+                if session is None:
+                    session = HttpClient._build_session()
+                    HttpClient._sessions[upstream] = session
+        return session
+
+    @staticmethod
+    def _build_session() -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=settings.UPSTREAM_HTTP_POOL_CONNECTIONS,
+            pool_maxsize=settings.UPSTREAM_HTTP_POOL_SIZE,
+            pool_block=False,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["Connection"] = "keep-alive"
+        # The session is shared between requests, so no cookie may leak across them
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+    @staticmethod
+    def timeout() -> tuple:
+        return (
+            settings.UPSTREAM_HTTP_CONNECT_TIMEOUT,
+            settings.UPSTREAM_HTTP_READ_TIMEOUT,
+        )
+
+    @staticmethod
+    def request(
+        method: str,
+        url: str,
+        upstream: str = VC_SERVICE,
+        operation: str = None,
+        **kwargs,
+    ) -> requests.Response:
+        kwargs.setdefault("timeout", HttpClient.timeout())
+        operation = operation or method.upper()
+        with span("http.client", f"{upstream} {operation}"), guarded_call(
+            upstream, operation
+        ) as call:
+            response = HttpClient.session(upstream).request(method, url, **kwargs)
+            call.failed = response.status_code >= 500
+        return response
+
+
+class AsyncHttpClient:
+    """
+    Asyncio counterpart of ``HttpClient`` for the async views.
+
+    Keeps one pooled ``httpx.AsyncClient`` per upstream and per event loop,
+    with the same pool size and timeouts as the synchronous client. The clients
+    of a loop are closed when that loop shuts down.
+    """
+
+    # Event loop -> (clients per upstream, generator closing them)
+    _loops = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    async def client(upstream: str = VC_SERVICE) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        state = AsyncHttpClient._loops.get(loop)
+        if state is None:
+            clients = {}
+            closer = AsyncHttpClient._close_at_shutdown(clients)
+            state = AsyncHttpClient._loops[loop] = (clients, closer)
+            # Once started, the generator is finalized on the loop by its
+            # shutdown_asyncgens(), which asyncio.run (and so async_to_sync and
+            # the ASGI server) calls before closing it
+            await anext(closer)
+        clients = state[0]
+        client = clients.get(upstream)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.UPSTREAM_HTTP_POOL_SIZE,
+                    max_keepalive_connections=settings.UPSTREAM_HTTP_POOL_SIZE,
+                ),
+                timeout=httpx.Timeout(
+                    settings.UPSTREAM_HTTP_READ_TIMEOUT,
+                    connect=settings.UPSTREAM_HTTP_CONNECT_TIMEOUT,
+                ),
+            )
+            clients[upstream] = client
+        return client
+
+    @staticmethod
+    async def _close_at_shutdown(clients: dict):
+        try:
+            yield
+        finally:
+            for client in clients.values():
+                await client.aclose()
+
+    @staticmethod
+    async def request(
+        method: str,
+        url: str,
+        upstream: str = VC_SERVICE,
+        operation: str = None,
+        **kwargs,
+    ) -> httpx.Response:
+        # requests silently drops None values from query strings and forms,
+        # httpx would send them as empty strings
+        for key in ("params", "data"):
+            if isinstance(kwargs.get(key), dict):
+                kwargs[key] = {k: v for k, v in kwargs[key].items() if v is not None}
+        operation = operation or method.upper()
+        with span("http.client", f"{upstream} {operation}"), guarded_call(
+            upstream, operation
+        ) as call:
+            client = await AsyncHttpClient.client(upstream)
+            response = await client.request(method, url, **kwargs)
+            call.failed = response.status_code >= 500
+        return response
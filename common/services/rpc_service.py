@@ -1,19 +1,37 @@
+import copy
 import json
-
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from common.error.http_error import HTTPError
+from common.services.http_client import HttpClient
+from common.utils.sentry_utils import span
 from project import settings
 
 
+# JSON-RPC "Internal error" code, for batch calls the VC Service did not answer
+RPC_INTERNAL_ERROR = -32603
+
+
 class RpcService:
+    # Monotonic time until which each RPC endpoint is sent single calls only,
+    # after it rejected a batch array
+    batch_unsupported_until: dict = {}
+
     def __init__(self, body):
         self.body: dict = body
 
+    @staticmethod
+    def url() -> str:
+        return settings.VC_SERVICE_URL.replace("/api", "") + "/rpc"
+
     def send_request(self) -> dict:
+        method = self.body.get("method", "")
         try:
-            url = settings.VC_SERVICE_URL.replace("/api", "")
-            response = requests.request("POST", url + "/rpc", json=self.body)
+            with span("rpc", method):
+                response = HttpClient.request(
+                    "POST", RpcService.url(), operation="rpc:" + method, json=self.body
+                )
         except Exception as e:
             raise Exception(e)
 
@@ -25,6 +43,109 @@ class RpcService:
             )
         return return_dict
 
+    @staticmethod
+    def send_batch(bodies: list[dict], max_workers: int = 1) -> list[dict]:
+        """
+        Sends independent calls as JSON-RPC batch arrays of up to
+        RPC_BATCH_SIZE calls, so each array costs a single round-trip.
+
+        Returns one dict per body, in the same order, with either the
+        ``result`` or the ``error`` of the call. When the VC Service rejects
+        a batch array, its calls are sent one by one, ``max_workers`` at a
+        time, and so are the next calls to that endpoint for
+        RPC_BATCH_RETRY_INTERVAL seconds.
+        """
+        results = []
+        url = RpcService.url()
+        size = max(settings.RPC_BATCH_SIZE, 1)
+        for start in range(0, len(bodies), size):
+            chunk = bodies[start : start + size]
+            answers = None
+            if RpcService.batch_unsupported_until.get(url, 0) <= time.monotonic():
+                answers = RpcService._send_chunk(url, chunk)
+            if answers is None:
+                answers = RpcService._send_each(chunk, max_workers)
+            results.extend(answers)
+        return results
+
+    @staticmethod
+    def _send_chunk(url: str, bodies: list[dict]) -> list[dict] | None:
+        """
+        Sends ``bodies`` as one batch array. Returns None if the VC Service
+        rejected the array without running it (4xx, or a single JSON-RPC
+        error instead of an array), so the calls can be sent one by one.
+
+        Any other answer (5xx, invalid JSON) does not tell whether the calls
+        ran: they fail with RPC_INTERNAL_ERROR instead of being sent again.
+        """
+        batch = []
+        for id, body in enumerate(bodies):
+            # Each call gets its position as id, to match it with its response
+            body = copy.copy(body)
+            body["id"] = id
+            batch.append(body)
+        methods = sorted({body.get("method", "") for body in batch})
+        try:
+            with span("rpc", "batch:" + ",".join(methods)):
+                response = HttpClient.request(
+                    "POST", url, operation="rpc:batch", json=batch
+                )
+        except Exception as e:
+            raise Exception(e)
+        try:
+            content = json.loads(response.content.decode("utf-8"))
+        except ValueError:
+            content = None
+
+        if not isinstance(content, list):
+            if 400 <= response.status_code < 500 or (
+                response.status_code < 300 and isinstance(content, dict)
+            ):
+                # The array was rejected as a whole (e.g. "Invalid Request")
+                RpcService.batch_unsupported_until[url] = (
+                    time.monotonic() + settings.RPC_BATCH_RETRY_INTERVAL
+                )
+                return None
+            error = {
+                "code": RPC_INTERNAL_ERROR,
+                "message": f"Unknown outcome of the batch (HTTP {response.status_code})",
+            }
+            return [{"error": error} for _ in batch]
+
+        by_id = {
+            item.get("id"): item for item in content if isinstance(item, dict)
+        }
+        results = []
+        for id in range(len(batch)):
+            item = by_id.get(id)
+            if item is None:
+                item = {
+                    "error": {
+                        "code": RPC_INTERNAL_ERROR,
+                        "message": "No response for this call",
+                    }
+                }
+            results.append(
+                {"error": item["error"]}
+                if item.get("error") is not None
+                else {"result": item.get("result")}
+            )
+        return results
+
+    @staticmethod
+    def _send_each(bodies: list[dict], max_workers: int) -> list[dict]:
+        def send(body):
+            try:
+                content = RpcService(body).send_request()["content"]
+                return {"result": content.get("result")}
+            except HTTPError as error:
+                return {"error": {"code": error.status, "data": error.content}}
+            except Exception as error:
+                return {"error": {"code": RPC_INTERNAL_ERROR, "message": str(error)}}
+
+        with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+            return list(executor.map(send, bodies))
+
     @staticmethod
     def from_request_vc_payload(
         offer: str, vc_type: list[str], did: str, pin_code: int = None
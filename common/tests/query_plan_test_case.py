@@ -0,0 +1,22 @@
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase
+
+
+class QueryPlanTestCase(TestCase):
+    """
+    Checks with ``EXPLAIN`` that hot queries are answered from an index.
+
+    Sequential scans are disabled for the test transaction, so PostgreSQL
+    only plans one when no index can serve the query, even on the small
+    tables of the test database.
+    """
+
+    def setUp(self):
+        super().setUp()
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset: QuerySet):
+        plan = queryset.explain()
+        self.assertNotIn("Seq Scan", plan, f"{queryset.query}\n{plan}")
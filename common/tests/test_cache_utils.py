@@ -0,0 +1,96 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from common.utils import cache_utils
+from common.utils.cache_utils import get_or_fetch
+
+
+class GetOrFetchTests(SimpleTestCase):
+    key = "test-key"
+
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        self.fetches = 0
+        patcher = mock.patch.object(cache_utils.time, "time", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fetch(self):
+        self.fetches += 1
+        return f"value-{self.fetches}"
+
+    def get(self, fetch=None, **kwargs):
+        return get_or_fetch(self.key, fetch or self.fetch, 60, 1, **kwargs)
+
+    def test_fresh_hit(self):
+        self.assertEqual(self.get(), "value-1")
+        self.now += 59
+        self.assertEqual(self.get(), "value-1")
+        self.assertEqual(self.fetches, 1)
+
+    def test_stale_hit_refreshed(self):
+        self.get()
+        self.now += 60
+        self.assertEqual(self.get(), "value-2")
+        self.assertIsNone(cache.get(self.key + ":fetching"))
+
+    def test_stale_served_while_another_worker_refreshes(self):
+        self.get()
+        self.now += 60
+        cache.add(self.key + ":fetching", 1)
+        self.assertEqual(self.get(), "value-1")
+        self.assertEqual(self.fetches, 1)
+
+    def test_last_good_value_served_when_fetch_raises(self):
+        self.get()
+        self.now += 60
+
+        def failing():
+            raise ConnectionError("down")
+
+        self.assertEqual(self.get(failing), "value-1")
+        self.assertIsNone(cache.get(self.key + ":fetching"))
+
+    def test_error_raised_when_nothing_cached(self):
+        def failing():
+            raise ConnectionError("down")
+
+        with self.assertRaises(ConnectionError):
+            self.get(failing)
+        self.assertIsNone(cache.get(self.key + ":fetching"))
+
+    def test_concurrent_misses_fetch_once(self):
+        def slow_fetch():
+            time.sleep(0.1)
+            return self.fetch()
+
+        values = []
+        threads = [
+            threading.Thread(target=lambda: values.append(self.get(slow_fetch))) for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.fetches, 1)
+        self.assertEqual(values, ["value-1"] * 10)
+
+    def test_miss_waits_for_another_worker(self):
+        cache.add(self.key + ":fetching", 1)
+        threading.Timer(
+            0.1, lambda: cache.set(self.key, {"value": "theirs", "fetched_at": self.now})
+        ).start()
+        self.assertEqual(self.get(), "theirs")
+        self.assertEqual(self.fetches, 0)
+
+    def test_negative_ttl(self):
+        with mock.patch.object(cache, "set", wraps=cache.set) as cache_set:
+            self.assertIsNone(self.get(lambda: None, negative_ttl=5))
+        self.assertEqual(cache_set.call_args.kwargs["timeout"], 5)
+        self.now += 5
+        self.assertEqual(self.get(negative_ttl=5), "value-1")
@@ -0,0 +1,91 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from common.error.upstream_error import UpstreamUnavailableError
+from common.services import circuit_breaker as circuit_breakers
+from common.services.circuit_breaker import CircuitBreaker, guarded_call
+from project import settings
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(
+            circuit_breakers.time, "monotonic", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(
+            "vc_service", failure_threshold=3, reset_timeout=30, max_concurrency=2
+        )
+
+    def call(self, failed: bool):
+        self.breaker.acquire()
+        self.breaker.release(failed)
+
+    def test_opens_after_consecutive_failures(self):
+        self.call(True)
+        self.call(True)
+        self.call(False)
+        self.call(True)
+        self.call(True)
+        self.assertEqual(self.breaker.state, circuit_breakers.CLOSED)
+        self.call(True)
+        self.assertEqual(self.breaker.state, circuit_breakers.OPEN)
+        self.now += 10
+        with self.assertRaises(UpstreamUnavailableError) as raised:
+            self.breaker.acquire()
+        self.assertEqual(raised.exception.retry_after, 20)
+        self.assertEqual(raised.exception.reason, circuit_breakers.OPEN)
+
+    def test_single_probe_closes_it(self):
+        for _ in range(3):
+            self.call(True)
+        self.now += 30
+        self.breaker.acquire()
+        with self.assertRaises(UpstreamUnavailableError):
+            self.breaker.acquire()
+        self.breaker.release(False)
+        self.assertEqual(self.breaker.state, circuit_breakers.CLOSED)
+        self.call(False)
+
+    def test_failed_probe_opens_it_again(self):
+        for _ in range(3):
+            self.call(True)
+        self.now += 30
+        self.call(True)
+        self.assertEqual(self.breaker.state, circuit_breakers.OPEN)
+        with self.assertRaises(UpstreamUnavailableError):
+            self.breaker.acquire()
+
+    def test_bulkhead_rejects_over_the_limit(self):
+        self.breaker.acquire()
+        self.breaker.acquire()
+        with self.assertRaises(UpstreamUnavailableError) as raised:
+            self.breaker.acquire()
+        self.assertEqual(raised.exception.reason, "bulkhead")
+        self.breaker.release(False)
+        self.breaker.acquire()
+
+    def test_guarded_call_counts_marked_failures(self):
+        with mock.patch.object(circuit_breakers, "circuit_breaker", return_value=self.breaker):
+            for _ in range(3):
+                with guarded_call("vc_service", "test") as call:
+                    call.failed = True
+            with self.assertRaises(UpstreamUnavailableError):
+                with guarded_call("vc_service", "test"):
+                    pass
+        self.assertEqual(self.breaker.in_flight, 0)
+
+    def test_max_concurrency_per_upstream(self):
+        self.addCleanup(setattr, circuit_breakers, "_pid", None)
+        circuit_breakers._pid = None
+        overrides = {"entity": 5}
+        with mock.patch.object(settings, "UPSTREAM_MAX_CONCURRENCY", 20), mock.patch.object(
+            settings, "UPSTREAM_MAX_CONCURRENCY_OVERRIDES", overrides
+        ):
+            entity = circuit_breakers.circuit_breaker("entity")
+            vc_service = circuit_breakers.circuit_breaker("vc_service")
+        self.assertEqual(entity.max_concurrency, 5)
+        self.assertEqual(vc_service.max_concurrency, 20)
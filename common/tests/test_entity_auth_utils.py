@@ -0,0 +1,73 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from common.utils import entity_auth_utils
+
+
+class EntityTokenCacheTests(SimpleTestCase):
+    url = "https://auth.example.org/token"
+
+    def setUp(self):
+        cache.clear()
+        entity_auth_utils._tokens.clear()
+        self.fetches = 0
+        patcher = mock.patch.object(
+            entity_auth_utils, "_request_token", side_effect=self.request_token
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.lock_key = entity_auth_utils._token_cache_key(self.url, "id") + ":fetching"
+
+    def request_token(self, token_url, client_id, client_secret):
+        self.fetches += 1
+        time.sleep(0.05)
+        now = time.time()
+        return {
+            "access_token": f"token-{self.fetches}",
+            "refresh_at": now + 100,
+            "expires_at": now + 200,
+        }
+
+    def get(self):
+        return entity_auth_utils.get_bearer_token(self.url, "id", "secret")
+
+    def test_concurrent_callers_share_one_request(self):
+        tokens = []
+        threads = [threading.Thread(target=lambda: tokens.append(self.get())) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.fetches, 1)
+        self.assertEqual(set(tokens), {"token-1"})
+        self.assertIsNone(cache.get(self.lock_key))
+
+    def test_shared_through_the_cache(self):
+        self.get()
+        entity_auth_utils._tokens.clear()
+        self.assertEqual(self.get(), "token-1")
+        self.assertEqual(self.fetches, 1)
+
+    def test_current_token_used_while_another_worker_refreshes(self):
+        self.get()
+        entry = entity_auth_utils._tokens[(self.url, "id")]
+        entry["refresh_at"] = time.time() - 1
+        cache.clear()
+        cache.add(self.lock_key, 1)
+        self.assertEqual(self.get(), "token-1")
+        self.assertEqual(self.fetches, 1)
+
+    def test_lock_of_another_worker_kept_after_waiting(self):
+        cache.add(self.lock_key, "other")
+        with mock.patch.object(entity_auth_utils, "wait_for", return_value=None):
+            self.assertEqual(self.get(), "token-1")
+        self.assertEqual(cache.get(self.lock_key), "other")
+
+    def test_invalidated(self):
+        self.get()
+        entity_auth_utils.invalidate_bearer_token(self.url, "id")
+        self.assertEqual(self.get(), "token-2")
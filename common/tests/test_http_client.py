@@ -0,0 +1,26 @@
+import asyncio
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from common.services.http_client import ENTITY, VC_SERVICE, AsyncHttpClient
+
+
+class AsyncHttpClientTests(SimpleTestCase):
+    def test_clients_reused_within_a_loop(self):
+        async def clients():
+            return [
+                await AsyncHttpClient.client(upstream) for upstream in (ENTITY, ENTITY, VC_SERVICE)
+            ]
+
+        first, again, other = asyncio.run(clients())
+        self.assertIs(first, again)
+        self.assertIsNot(first, other)
+        self.assertIsNot(asyncio.run(clients())[0], first)
+
+    def test_clients_closed_when_the_loop_shuts_down(self):
+        async def clients():
+            return [await AsyncHttpClient.client(upstream) for upstream in (ENTITY, VC_SERVICE)]
+
+        for client in async_to_sync(clients)():
+            self.assertTrue(client.is_closed)
@@ -0,0 +1,115 @@
+from json import dumps
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from common.services.http_client import HttpClient
+from common.services.rpc_service import RPC_INTERNAL_ERROR, RpcService
+from project import settings
+
+
+class RpcBatchTests(SimpleTestCase):
+    def setUp(self):
+        RpcService.batch_unsupported_until.clear()
+        self.addCleanup(RpcService.batch_unsupported_until.clear)
+        self.requests = []
+        self.now = 1000.0
+        for target, name, side_effect in (
+            (HttpClient, "request", self.request),
+            (RpcService, "url", lambda: "http://vc-service/rpc"),
+        ):
+            patcher = mock.patch.object(target, name, side_effect=side_effect)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch(
+            "common.services.rpc_service.time.monotonic", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, method, url, json=None, **kwargs):
+        self.requests.append(json)
+        status, content = self.answer(json)
+        response = mock.Mock(status_code=status)
+        response.content = content if isinstance(content, bytes) else dumps(content).encode()
+        return response
+
+    def answer(self, body):
+        if isinstance(body, list):
+            # Answered out of order, without the second call
+            return 200, [
+                {"jsonrpc": "2.0", "id": call["id"], "result": call["params"]}
+                for call in reversed(body)
+                if call["id"] != 1
+            ]
+        return 200, {"jsonrpc": "2.0", "id": None, "result": body["params"]}
+
+    def answer_batch(self, status, content):
+        self.answer = lambda body: (
+            (status, content) if isinstance(body, list) else (200, {"result": body["params"]})
+        )
+
+    @staticmethod
+    def bodies(count):
+        return [
+            {"jsonrpc": "2.0", "method": "revokeAccreditation", "params": n} for n in range(count)
+        ]
+
+    def batches_sent(self) -> int:
+        return sum(isinstance(body, list) for body in self.requests)
+
+    def test_results_matched_by_id(self):
+        results = RpcService.send_batch(self.bodies(3))
+        self.assertEqual(results[0], {"result": 0})
+        self.assertEqual(results[2], {"result": 2})
+        self.assertEqual(len(self.requests), 1)
+
+    def test_missing_id_is_an_error(self):
+        results = RpcService.send_batch(self.bodies(3))
+        self.assertEqual(results[1]["error"]["code"], RPC_INTERNAL_ERROR)
+
+    def test_chunks_of_batch_size(self):
+        with mock.patch.object(settings, "RPC_BATCH_SIZE", 2):
+            results = RpcService.send_batch(self.bodies(5))
+        self.assertEqual(len(self.requests), 3)
+        self.assertEqual(results[2], {"result": 2})
+        self.assertEqual(results[4], {"result": 4})
+        self.assertEqual(len(results), 5)
+
+    def test_rejected_batch_sent_one_by_one(self):
+        for status in (400, 200):
+            RpcService.batch_unsupported_until.clear()
+            self.requests = []
+            self.answer_batch(status, {"error": {"code": -32600, "message": "Invalid Request"}})
+            results = RpcService.send_batch(self.bodies(3))
+            self.assertEqual(results, [{"result": n} for n in range(3)])
+            self.assertEqual(self.batches_sent(), 1)
+            self.assertEqual(len(self.requests), 4)
+
+    def test_rejection_remembered_for_a_while(self):
+        self.answer_batch(400, b"<html>Bad Request</html>")
+        RpcService.send_batch(self.bodies(2))
+        self.now += settings.RPC_BATCH_RETRY_INTERVAL - 1
+        RpcService.send_batch(self.bodies(2))
+        self.assertEqual(self.batches_sent(), 1)
+        self.now += 1
+        RpcService.send_batch(self.bodies(2))
+        self.assertEqual(self.batches_sent(), 2)
+
+    def test_rejection_remembered_per_endpoint(self):
+        self.answer_batch(400, {"error": {"code": -32600, "message": "Invalid Request"}})
+        RpcService.send_batch(self.bodies(2))
+        with mock.patch.object(RpcService, "url", return_value="http://other/rpc"):
+            RpcService.send_batch(self.bodies(2))
+        self.assertEqual(self.batches_sent(), 2)
+
+    def test_unknown_outcome_not_sent_again(self):
+        for status, content in ((502, b"<html>Bad Gateway</html>"), (200, b"not json")):
+            self.requests = []
+            self.answer_batch(status, content)
+            results = RpcService.send_batch(self.bodies(2))
+            self.assertEqual(
+                [result["error"]["code"] for result in results], [RPC_INTERNAL_ERROR] * 2
+            )
+            self.assertEqual(len(self.requests), 1)
+            self.assertEqual(RpcService.batch_unsupported_until, {})
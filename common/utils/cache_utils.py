@@ -0,0 +1,105 @@
+import threading
+import time
+import zlib
+from typing import Any, Callable
+
+from django.core.cache import cache
+
+# Seconds between two checks of the cache while another worker fetches
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+# Seconds a value is still kept once stale, to be served while it is
+# refreshed or when the refresh fails
+STALE_VALUE_TTL = 24 * 3600
+
+# Locks of the keys fetched in this process, striped so that any number of
+# keys share a fixed set of locks. Reentrant, so a fetch may look up another
+# key of the same stripe.
+LOCAL_LOCK_STRIPES = 64
+_local_locks = [threading.RLock() for _ in range(LOCAL_LOCK_STRIPES)]
+
+
+def _local_lock(key: str) -> threading.RLock:
+    return _local_locks[zlib.crc32(key.encode("utf-8")) % LOCAL_LOCK_STRIPES]
+
+
+def get_or_fetch(
+    key: str,
+    fetch: Callable[[], Any],
+    ttl: int,
+    fetch_timeout: float,
+    negative_ttl: int | None = None,
+) -> Any:
+    """
+    Returns the value cached under ``key``, calling ``fetch`` when it is
+    missing or older than ``ttl`` seconds (``negative_ttl`` seconds, if
+    given, when the cached value is None).
+
+    - Stale-while-revalidate: a stale value is still returned to every caller
+      except the one refreshing it.
+    - Single-flight: only one caller per key, across threads and workers,
+      calls ``fetch`` at a time. The others wait for its result for up to
+      ``fetch_timeout`` seconds when nothing is cached yet.
+    - The last good value is kept STALE_VALUE_TTL seconds after it goes
+      stale and is returned when ``fetch`` raises. The error is only raised
+      if nothing is cached.
+    - A None value expires after ``negative_ttl`` seconds, so made up keys
+      do not stay in the cache.
+    """
+
+    def is_fresh(entry) -> bool:
+        if entry is None:
+            return False
+        max_age = ttl
+        if entry["value"] is None and negative_ttl is not None:
+            max_age = negative_ttl
+        return time.time() - entry["fetched_at"] < max_age
+
+    entry = cache.get(key)
+    if is_fresh(entry):
+        return entry["value"]
+
+    local_lock = _local_lock(key)
+    if not local_lock.acquire(blocking=entry is None):
+        # Another thread of this process is already refreshing it
+        return entry["value"]
+    try:
+        entry = cache.get(key)
+        if is_fresh(entry):
+            return entry["value"]
+
+        lock_key = key + ":fetching"
+        if not cache.add(lock_key, 1, timeout=int(fetch_timeout) + 1):
+            # Another worker is fetching it
+            if entry is not None:
+                return entry["value"]
+            entry = wait_for(key, fetch_timeout)
+            if entry is not None:
+                return entry["value"]
+        try:
+            value = fetch()
+        except Exception:
+            cache.delete(lock_key)
+            if entry is not None:
+                return entry["value"]
+            raise
+        if value is None and negative_ttl is not None:
+            timeout = negative_ttl
+        else:
+            timeout = ttl + STALE_VALUE_TTL
+        cache.set(key, {"value": value, "fetched_at": time.time()}, timeout=timeout)
+        cache.delete(lock_key)
+        return value
+    finally:
+        local_lock.release()
+
+
+def wait_for(key: str, timeout: float) -> Any:
+    """Polls the cache until ``key`` is set, for up to ``timeout`` seconds."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
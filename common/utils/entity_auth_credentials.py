@@ -1,4 +1,5 @@
 import json
+from functools import lru_cache
 from typing import Optional
 
 
@@ -52,11 +53,15 @@ class EntityAuthCredentials:
         return self.is_api_key_valid() or self.is_oauth2_valid()
 
     @staticmethod
+    @lru_cache(maxsize=32)
     def from_input(data: str) -> "EntityAuthCredentials":
         """
         Creates an AuthCredentials object from a string representing
         an API Key directly or a JSON object with the required fields.
 
+        Results are memoised, so the returned instance is shared and must not
+        be modified.
+
         :param data: String containing either an API Key or a JSON object.
         :return: An instance of AuthCredentials.
         """
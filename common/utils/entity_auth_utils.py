@@ -1,21 +1,101 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
 import requests
+from django.core.cache import cache
 
+from common.services.http_client import ENTITY_AUTH, HttpClient
+from common.utils.cache_utils import wait_for
 from common.utils.entity_auth_credentials import EntityAuthCredentials
+from project import settings
+
+# Tokens of this process by (token_url, client_id), each one a dict with
+# "access_token", "refresh_at" and "expires_at" (epoch seconds)
+_tokens: dict = {}
+_token_locks = defaultdict(threading.Lock)
+
+
+def _token_cache_key(token_url: str, client_id: str) -> str:
+    digest = hashlib.sha256(f"{token_url}\n{client_id}".encode("utf-8")).hexdigest()
+    return f"entity-token:{digest}"
 
 
 def get_bearer_token(token_url: str, client_id: str, client_secret: str) -> str:
     """
     Obtains a Bearer Token using OAuth2 Client Credentials.
 
+    Tokens are shared by (token_url, client_id) in this process and through
+    the Django cache with the other workers until they expire. They are
+    refreshed ENTITY_TOKEN_REFRESH_MARGIN seconds before ``expires_in``, and
+    only one caller requests a new one at a time while the others keep using
+    the current token, or wait for the new one if there is none.
+
     :param token_url: URL of the authentication server to obtain the token.
     :param client_id: Client ID registered with the authentication server.
     :param client_secret: Secret associated with the client.
     :return: The Bearer Token as a string.
     :raises: Exception if an error occurs while obtaining the token.
     """
+    key = (token_url, client_id)
+    entry = _tokens.get(key)
+    if entry is not None and time.time() < entry["refresh_at"]:
+        return entry["access_token"]
+
+    usable = entry is not None and time.time() < entry["expires_at"]
+    local_lock = _token_locks[key]
+    if not local_lock.acquire(blocking=not usable):
+        # Another thread of this process is already refreshing it
+        return entry["access_token"]
+    try:
+        cache_key = _token_cache_key(token_url, client_id)
+        entry = cache.get(cache_key) or _tokens.get(key)
+        if entry is not None and time.time() < entry["refresh_at"]:
+            _tokens[key] = entry
+            return entry["access_token"]
+        usable = entry is not None and time.time() < entry["expires_at"]
+
+        lock_key = cache_key + ":fetching"
+        lock_timeout = sum(HttpClient.timeout())
+        owns_lock = cache.add(lock_key, 1, timeout=int(lock_timeout) + 1)
+        if not owns_lock:
+            # Another worker is requesting it
+            if usable:
+                return entry["access_token"]
+            entry = wait_for(cache_key, lock_timeout)
+            if entry is not None:
+                _tokens[key] = entry
+                return entry["access_token"]
+            # It did not finish in time: the lock is only released by the
+            # worker that took it, this one requests the token either way
+            owns_lock = cache.add(lock_key, 1, timeout=int(lock_timeout) + 1)
+        try:
+            entry = _request_token(token_url, client_id, client_secret)
+        finally:
+            if owns_lock:
+                cache.delete(lock_key)
+        cache.set(
+            cache_key, entry, timeout=max(int(entry["expires_at"] - time.time()), 1)
+        )
+        _tokens[key] = entry
+        return entry["access_token"]
+    finally:
+        local_lock.release()
+
+
+def invalidate_bearer_token(token_url: str, client_id: str) -> None:
+    """Forgets the token, e.g. after the entity rejects it."""
+    _tokens.pop((token_url, client_id), None)
+    cache.delete(_token_cache_key(token_url, client_id))
+
+
+def _request_token(token_url: str, client_id: str, client_secret: str) -> dict:
     try:
-        response = requests.post(
+        response = HttpClient.request(
+            "POST",
             token_url,
+            upstream=ENTITY_AUTH,
             data={
                 "grant_type": "client_credentials",
                 "client_id": client_id,
@@ -25,10 +105,19 @@ def get_bearer_token(token_url: str, client_id: str, client_secret: str) -> str:
         )
         response.raise_for_status()
         token_data = response.json()
-        return token_data.get("access_token", "")
     except requests.RequestException as e:
         raise Exception(f"Error al obtener el Bearer Token: {e}")
 
+    fetched_at = time.time()
+    expires_in = int(token_data.get("expires_in") or settings.ENTITY_TOKEN_DEFAULT_TTL)
+    # Short-lived tokens are refreshed halfway through their lifetime
+    refresh_in = max(expires_in - settings.ENTITY_TOKEN_REFRESH_MARGIN, expires_in / 2)
+    return {
+        "access_token": token_data.get("access_token", ""),
+        "refresh_at": fetched_at + refresh_in,
+        "expires_at": fetched_at + expires_in,
+    }
+
 
 def add_entity_auth_headers(original_headers: dict, entity_auth_config: any) -> dict:
     """
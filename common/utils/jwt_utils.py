@@ -0,0 +1,64 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import jwt
+
+from common.utils.sentry_utils import span
+
+# Number of decoded JWTs kept in memory by each process
+DECODED_JWT_CACHE_SIZE = 256
+
+
+class ParsedJwt:
+    """
+    Header and claims of a JWT, decoded without verifying its signature.
+
+    Instances are shared between every caller decoding the same token, so
+    the ``header`` and ``payload`` dictionaries must not be modified.
+    """
+
+    def __init__(self, header: dict, payload: dict):
+        self.header = header
+        self.payload = payload
+
+    @property
+    def vc(self) -> dict:
+        """The ``vc`` claim of a credential JWT."""
+        return self.payload.get("vc") or {}
+
+
+_decoded: "OrderedDict[bytes, ParsedJwt]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def decode_jwt(token: str) -> ParsedJwt:
+    """
+    Decodes a JWT without verifying its signature.
+
+    Results are memoised by the SHA-256 of the token, so the same credential
+    is only base64/JSON decoded once while it goes through issuance, storage,
+    signals, Celery tasks and the admin.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    with _lock:
+        parsed = _decoded.get(key)
+        if parsed is not None:
+            _decoded.move_to_end(key)
+            return parsed
+
+    with span("jwt.decode", "decode_jwt"):
+        decoded = jwt.api_jwt.decode_complete(
+            token, "", algorithms=None, options={"verify_signature": False}
+        )
+    parsed = ParsedJwt(decoded.get("header"), decoded.get("payload"))
+    with _lock:
+        _decoded[key] = parsed
+        if len(_decoded) > DECODED_JWT_CACHE_SIZE:
+            _decoded.popitem(last=False)
+    return parsed
+
+
+def decode_bearer_token(authorization: str) -> ParsedJwt:
+    """Decodes the access token of an ``Authorization: Bearer`` header."""
+    return decode_jwt(authorization.replace("Bearer", "").replace("BEARER", "").lstrip())
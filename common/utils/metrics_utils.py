@@ -0,0 +1,135 @@
+"""
+Prometheus metrics of the backend.
+
+When ``PROMETHEUS_MULTIPROC_DIR`` is set (Gunicorn workers, Celery prefork
+pool) every process writes its samples to that directory and the exporter
+adds them up, otherwise the metrics of the current process are exported.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent serving a request, per view (DRF action)",
+    ["view", "method", "status"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries run by a request, per view (DRF action)",
+    ["view"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Time spent waiting for an upstream service",
+    ["upstream", "operation"],
+)
+UPSTREAM_ERRORS = Counter(
+    "upstream_request_errors_total",
+    "Upstream calls that raised or got a 5xx response",
+    ["upstream", "operation"],
+)
+UPSTREAM_REJECTIONS = Counter(
+    "upstream_request_rejections_total",
+    "Upstream calls not made because the circuit is open or the bulkhead full",
+    ["upstream", "reason"],
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "upstream_requests_in_flight",
+    "Upstream calls waiting for a response",
+    ["upstream"],
+    multiprocess_mode="livesum",
+)
+ENTITY_NOTIFICATIONS_ABANDONED = Counter(
+    "entity_notifications_abandoned_total",
+    "Entity notifications left undelivered after their last attempt",
+)
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Time spent running a Celery task",
+    ["task", "state"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+
+
+class UpstreamCall:
+    """Outcome of a call tracked by ``track_upstream``."""
+
+    def __init__(self):
+        self.failed = False
+
+
+@contextmanager
+def track_upstream(upstream: str, operation: str):
+    """
+    Measures a call to an upstream service. The call is counted as an error
+    if it raises or if the caller sets ``failed`` on the yielded object.
+    """
+    in_flight = UPSTREAM_IN_FLIGHT.labels(upstream)
+    in_flight.inc()
+    call = UpstreamCall()
+    start = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.failed = True
+        raise
+    finally:
+        in_flight.dec()
+        UPSTREAM_LATENCY.labels(upstream, operation).observe(time.perf_counter() - start)
+        if call.failed:
+            UPSTREAM_ERRORS.labels(upstream, operation).inc()
+
+
+# Queries run by the current request, shared with the threads it delegates
+# its ORM calls to (sync_to_async copies the context)
+_query_count: ContextVar = ContextVar("query_count", default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """``connection_created`` receiver adding ``count_queries`` to the connection."""
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def start_query_count():
+    counter = [0]
+    return counter, _query_count.set(counter)
+
+
+def stop_query_count(token) -> None:
+    _query_count.reset(token)
+
+
+def registry() -> CollectorRegistry:
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    collector_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collector_registry)
+    return collector_registry
+
+
+def export() -> tuple[bytes, str]:
+    """Returns the exposition of every metric and its content type."""
+    return generate_latest(registry()), CONTENT_TYPE_LATEST
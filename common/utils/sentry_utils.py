@@ -0,0 +1,56 @@
+from contextlib import nullcontext
+
+import sentry_sdk
+
+from project import settings
+
+# Polled documents and static files, traced at SENTRY_METADATA_TRACES_SAMPLE_RATE
+METADATA_PATH_PREFIXES = (
+    "/.well-known/",
+    "/auth/jwks",
+    "/credentials/status/list/",
+    "/static/",
+)
+# Never traced
+IGNORED_PATHS = ("/metrics",)
+
+
+def _request_path(sampling_context: dict) -> str | None:
+    scope = sampling_context.get("asgi_scope")
+    if scope is not None:
+        return scope.get("path")
+    environ = sampling_context.get("wsgi_environ")
+    if environ is not None:
+        return environ.get("PATH_INFO")
+    return None
+
+
+def traces_sampler(sampling_context: dict) -> float:
+    """
+    Share of the transactions traced by Sentry.
+
+    Continued traces keep the decision of their parent, metadata endpoints
+    are down-sampled and everything else (requests, Celery tasks) is traced
+    at SENTRY_TRACES_SAMPLE_RATE.
+    """
+    parent_sampled = sampling_context.get("parent_sampled")
+    if parent_sampled is not None:
+        return float(parent_sampled)
+    path = _request_path(sampling_context)
+    if path is not None:
+        if path in IGNORED_PATHS:
+            return 0.0
+        if path.startswith(METADATA_PATH_PREFIXES):
+            return settings.SENTRY_METADATA_TRACES_SAMPLE_RATE
+    return settings.SENTRY_TRACES_SAMPLE_RATE
+
+
+def span(op: str, name: str):
+    """
+    Child span of the current transaction, or a no-op context manager when
+    the transaction is not being traced, so untraced requests pay nothing.
+    """
+    parent = sentry_sdk.get_current_span()
+    if parent is None or not parent.sampled:
+        return nullcontext()
+    return parent.start_child(op=op, name=name)
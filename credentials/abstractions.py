@@ -9,14 +9,14 @@ from credentials.serializers import CredentialResponseSerializer, ExternalDataRe
 class ACredentialService(ABC):
     @staticmethod
     @abstractmethod
-    def credentials(
+    async def credentials(
         request: Any, token: str, issuer: str
     ) -> List[CredentialResponseSerializer] | CredentialResponseSerializer | None:
         ...
 
     @staticmethod
     @abstractmethod
-    def deferred_credentials(token: str, issuer_id: str) -> CredentialResponseSerializer | None:
+    async def deferred_credentials(token: str, issuer_id: str) -> CredentialResponseSerializer | None:
         ...
 
     @staticmethod
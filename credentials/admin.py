@@ -1,6 +1,5 @@
 import json
 
-import jwt
 from django.contrib import admin
 from django.template.response import TemplateResponse
 from django.utils.safestring import mark_safe
@@ -9,6 +8,7 @@ from pygments import highlight
 from pygments.formatters import HtmlFormatter
 from pygments.lexers import JsonLexer
 
+from common.utils.jwt_utils import decode_jwt
 from credentials.models import IssuedVerifiableCredential, VerifiableCredential
 from project.settings import BACKEND_DOMAIN
 
@@ -16,21 +16,27 @@ from project.settings import BACKEND_DOMAIN
 class VerifiableCredentialAdmin(admin.ModelAdmin):
     model = VerifiableCredential
     readonly_fields = ("credential_prettified", "vc_types")
-    list_display = ("vc_types",)
-    search_fields = ["vc_types"]
+    list_display = ("vc_types", "holder_did", "issuance_date")
+    list_filter = ("issuance_date",)
+    search_fields = ["holder_did", "=reserved_attribute_id"]
+
+    def get_search_results(self, request, queryset, search_term):
+        base_queryset = queryset
+        queryset, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term
+        )
+        if search_term:
+            # Exact type match, answered by the GIN index on "types"
+            queryset |= base_queryset.filter(types__contains=[search_term])
+        return queryset, may_have_duplicates
 
     def credential_prettified(self, instance):
         if instance.credential:
             """Function to display pretty version of our data"""
-            jwt_decoded = jwt.api_jwt.decode_complete(
-                instance.credential,
-                "",
-                algorithms=None,
-                options={"verify_signature": False},
-            )
+            jwt_decoded = decode_jwt(instance.credential)
             headers_payload = {
-                "header": jwt_decoded.get("header"),
-                "payload": jwt_decoded.get("payload"),
+                "header": jwt_decoded.header,
+                "payload": jwt_decoded.payload,
             }
             # Convert the data to sorted, indented JSON
             response = json.dumps(headers_payload, sort_keys=True, indent=2)
@@ -54,19 +60,8 @@ class VerifiableCredentialAdmin(admin.ModelAdmin):
 
     def vc_types(self, instance):
         if instance.credential:
-            """Function to display pretty version of our data"""
-            jwt_decoded = jwt.api_jwt.decode_complete(
-                instance.credential,
-                "",
-                algorithms=["ES256", "ES256K"],
-                options={"verify_signature": False},
-            )
-            payload = jwt_decoded.get("payload")
-
             # Convert the data to sorted, indented JSON
-            response = json.dumps(
-                payload.get("vc").get("type"), sort_keys=True, indent=2
-            )
+            response = json.dumps(instance.types, sort_keys=True, indent=2)
 
             # Safe the output
             return response
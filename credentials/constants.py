@@ -3,3 +3,6 @@ EBSI_VC_TYPE = {
     "VerifiableAttestation",
     "VerifiableAccreditation",
 }
+
+# A StatusList2021 bitstring is 16 KiB long: one revocation bit per credential
+STATUS_LIST_CAPACITY = 16 * 1024 * 8
@@ -0,0 +1,24 @@
+# Generated by Django 5.1 on 2026-10-18 08:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credentials', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='statuslist2021',
+            name='last_modified',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Last modified'),
+        ),
+        migrations.AddField(
+            model_name='statuslist2021',
+            name='version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Content version'),
+        ),
+    ]
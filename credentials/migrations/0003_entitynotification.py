@@ -0,0 +1,32 @@
+# Generated by Django 5.1 on 2026-10-18 08:56
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credentials', '0002_statuslist2021_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntityNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vc_id', models.CharField(max_length=4000, unique=True, verbose_name='VC Identifier')),
+                ('payload', models.JSONField(verbose_name='Payload')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Next attempt')),
+                ('delivered_at', models.DateTimeField(blank=True, null=True, verbose_name='Delivered at')),
+                ('last_error', models.TextField(blank=True, null=True, verbose_name='Last error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+            ],
+            options={
+                'verbose_name': 'Entity Notification',
+                'verbose_name_plural': 'Entity Notifications',
+                'indexes': [models.Index(condition=models.Q(('delivered_at__isnull', True)), fields=['next_attempt_at'], name='entity_notification_pending')],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.1 on 2026-10-18 08:57
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import jwt
+from django.db import migrations, models
+from django.utils.dateparse import parse_datetime
+
+
+def fill_claims(apps, schema_editor):
+    VerifiableCredential = apps.get_model("credentials", "VerifiableCredential")
+    for credential in VerifiableCredential.objects.exclude(credential=None).iterator():
+        try:
+            payload = jwt.api_jwt.decode_complete(
+                credential.credential,
+                "",
+                algorithms=None,
+                options={"verify_signature": False},
+            ).get("payload")
+        except jwt.exceptions.DecodeError:
+            continue
+        vc = payload.get("vc") or {}
+        credential_subject = vc.get("credentialSubject") or {}
+        reserved_attribute_id = credential_subject.get("reservedAttributeId")
+        if reserved_attribute_id is None:
+            reserved_attribute_id = vc.get("reservedAttributeId")
+        issuance_date = vc.get("issuanceDate") or vc.get("validFrom")
+        VerifiableCredential.objects.filter(pk=credential.pk).update(
+            types=vc.get("type") or [],
+            holder_did=credential_subject.get("id"),
+            reserved_attribute_id=reserved_attribute_id,
+            issuance_date=parse_datetime(issuance_date) if issuance_date else None,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credentials', '0003_entitynotification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='verifiablecredential',
+            name='holder_did',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=4000, null=True, verbose_name='Holder DID'),
+        ),
+        migrations.AddField(
+            model_name='verifiablecredential',
+            name='issuance_date',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Issuance Date'),
+        ),
+        migrations.AddField(
+            model_name='verifiablecredential',
+            name='reserved_attribute_id',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=4000, null=True, verbose_name='Reserved Attribute Id'),
+        ),
+        migrations.AddField(
+            model_name='verifiablecredential',
+            name='types',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=4000), blank=True, default=list, editable=False, size=None, verbose_name='Credential Type'),
+        ),
+        migrations.AddIndex(
+            model_name='verifiablecredential',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['types'], name='vc_types_gin'),
+        ),
+        migrations.RunPython(fill_claims, migrations.RunPython.noop),
+    ]
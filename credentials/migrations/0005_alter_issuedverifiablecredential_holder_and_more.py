@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-18 09:01
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credentials', '0004_verifiablecredential_claims'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='issuedverifiablecredential',
+            name='holder',
+            field=models.CharField(db_index=True, max_length=4000, verbose_name='Holder DID'),
+        ),
+        migrations.AddIndex(
+            model_name='issuedverifiablecredential',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['vc_type'], name='issued_vc_type_gin'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1 on 2026-10-18 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credentials', '0005_alter_issuedverifiablecredential_holder_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entitynotification',
+            index=models.Index(condition=models.Q(('delivered_at__isnull', False)), fields=['delivered_at'], name='entity_notification_delivered'),
+        ),
+    ]
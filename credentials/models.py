@@ -1,13 +1,18 @@
-import math
 from operator import itemgetter
 
-import jwt
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Now
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.translation import gettext_lazy as _
 
+from common.utils.jwt_utils import decode_jwt
+from credentials.constants import STATUS_LIST_CAPACITY
+from credentials.tasks import refresh_status_list_credential
 from credentials.utils import get_first_matching_element
 from ebsi.enums import AccreditationTypes
 from ebsi.models import (
@@ -24,22 +29,56 @@ class VerifiableCredential(models.Model):
     credential = models.CharField(
         _("Credential (JWT Format)"), max_length=4000, null=True, blank=True
     )
+    # Claims copied from the credential on save, so they can be queried in SQL
+    types = ArrayField(
+        models.CharField(max_length=4000),
+        verbose_name=_("Credential Type"),
+        default=list,
+        blank=True,
+        editable=False,
+    )
+    holder_did = models.CharField(
+        _("Holder DID"),
+        max_length=4000,
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+    )
+    reserved_attribute_id = models.CharField(
+        _("Reserved Attribute Id"),
+        max_length=4000,
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+    )
+    issuance_date = models.DateTimeField(
+        _("Issuance Date"), null=True, blank=True, editable=False, db_index=True
+    )
 
     class Meta:
         verbose_name = "Verifiable Credential"
         verbose_name_plural = "Verifiable Credentials"
+        indexes = [GinIndex(fields=["types"], name="vc_types_gin")]
+
+    def fill_claims(self):
+        """Copies the indexed claims of the credential into their columns."""
+        vc = decode_jwt(self.credential).vc
+        credential_subject = vc.get("credentialSubject") or {}
+        self.types = vc.get("type") or []
+        self.holder_did = credential_subject.get("id")
+        self.reserved_attribute_id = credential_subject.get("reservedAttributeId")
+        if self.reserved_attribute_id is None:
+            self.reserved_attribute_id = vc.get("reservedAttributeId")
+        issuance_date = vc.get("issuanceDate") or vc.get("validFrom")
+        self.issuance_date = parse_datetime(issuance_date) if issuance_date else None
 
     def save(self, *args, **kwargs):
+        if self.credential:
+            self.fill_claims()
         super().save(*args, **kwargs)
-        jwt_decoded = jwt.api_jwt.decode_complete(
-            self.credential,
-            "",
-            algorithms=["ES256", "ES256K"],
-            options={"verify_signature": False},
-        )
-        payload = jwt_decoded.get("payload")
-
-        vc = payload.get("vc")
+        vc = decode_jwt(self.credential).vc
 
         credential_subject = vc.get("credentialSubject")
         if self.check_if_accreditation_already_exists(
@@ -47,18 +86,16 @@ class VerifiableCredential(models.Model):
         ):
             return
 
-        types = vc.get("type")
+        types = self.types
 
-        holder_did = credential_subject.get("id")
+        holder_did = self.holder_did
 
         accreditation_type = get_first_matching_element(
             AccreditationTypes.values(), types
         )
 
         accredited_for_array = credential_subject.get("accreditedFor")
-        attribute_id = credential_subject.get("reservedAttributeId")
-        if attribute_id is None:
-            attribute_id = vc.get("reservedAttributeId")
+        attribute_id = self.reserved_attribute_id
         if (
             accreditation_type is not None
             and holder_did is not None
@@ -213,6 +250,13 @@ class VerifiableCredential(models.Model):
         )
 
 
+class SetBit(models.Func):
+    """PostgreSQL ``set_bit(bytes, n, value)``, bits numbered from the right within each byte."""
+
+    function = "set_bit"
+    output_field = models.BinaryField()
+
+
 class StatusList2021(models.Model):
     content = models.BinaryField()
     current_index = models.IntegerField(
@@ -222,6 +266,8 @@ class StatusList2021(models.Model):
         ],
         null=True,
     )
+    version = models.PositiveIntegerField(_("Content version"), default=0)
+    last_modified = models.DateTimeField(_("Last modified"), default=timezone.now)
 
     class Meta:
         verbose_name = "StatusList2021"
@@ -235,6 +281,21 @@ class StatusList2021(models.Model):
             self.content = bytearray(16 * 1024)
         return super().save(*args, **kwargs)
 
+    @staticmethod
+    def set_revoked(list_id: str, index: int) -> bool:
+        """
+        Sets the bit of ``index`` directly in the database, in a single atomic
+        UPDATE, without loading the bitstring.
+        """
+        # StatusList2021 counts bits from the most significant one of each byte
+        position = (index // 8) * 8 + 7 - index % 8
+        updated = StatusList2021.objects.filter(id=list_id).update(
+            content=SetBit(models.F("content"), models.Value(position), models.Value(1)),
+            version=models.F("version") + 1,
+            last_modified=Now(),
+        )
+        return updated > 0
+
 
 class IssuedVerifiableCredential(models.Model):
     vc_id = models.CharField(
@@ -252,7 +313,12 @@ class IssuedVerifiableCredential(models.Model):
     revocation_info = models.JSONField(
         _("Revocation Information"), null=True, blank=True
     )
-    holder = models.CharField(_("Holder DID"), max_length=4000, null=False)
+    holder = models.CharField(
+        _("Holder DID"), max_length=4000, null=False, db_index=True
+    )
+
+    class Meta:
+        indexes = [GinIndex(fields=["vc_type"], name="issued_vc_type_gin")]
 
     def clean(self):
         if not self.status:
@@ -263,18 +329,84 @@ class IssuedVerifiableCredential(models.Model):
             if current_model.status:
                 raise ValidationError("Can't restore the status of a revoked VC")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "status" in field_names:
+            instance._stored_status = instance.status
+        return instance
+
+    def status_list_entry(self) -> tuple[str, int]:
+        """
+        Returns the (status list id, index) of a StatusList2021Entry. Raises
+        ValueError if the index is out of the list.
+        """
+        list_array = self.revocation_info["statusListCredential"].split("/")
+        index = int(self.revocation_info["statusListIndex"])
+        if not 0 <= index < STATUS_LIST_CAPACITY:
+            raise ValueError(f"Status list index {index} out of range")
+        return list_array[len(list_array) - 1], index
+
+    def _stored_as_revoked(self) -> bool:
+        if "_stored_status" in self.__dict__:
+            return self._stored_status
+        return IssuedVerifiableCredential.objects.filter(
+            vc_id=self.vc_id, status=True
+        ).exists()
+
     def save(self, *args, **kwargs):
-        if self.status and self.revocation_type == "StatusList2021Entry":
-            revocation_info = self.revocation_info
-            list_array = revocation_info["statusListCredential"].split("/")
-            status_list_id = list_array[len(list_array) - 1]
-            index = int(revocation_info["statusListIndex"])
-            status_list = StatusList2021.objects.filter(id=status_list_id).last()
-            byte_index = math.floor(index / 8)
-            bit_index = int(index) % 8
-            list_data = bytearray(status_list.content)
-            list_data[byte_index] |= 128 >> bit_index
-            status_list.content = list_data
-            status_list.save()
+        # The bit is only set when the credential gets revoked
+        if (
+            self.status
+            and self.revocation_type == "StatusList2021Entry"
+            and not self._stored_as_revoked()
+        ):
+            status_list_id, index = self.status_list_entry()
+            if StatusList2021.set_revoked(status_list_id, index):
+                transaction.on_commit(
+                    lambda: refresh_status_list_credential.delay(status_list_id),
+                    robust=True,
+                )
 
-        return super().save(*args, **kwargs)
+        result = super().save(*args, **kwargs)
+        self._stored_status = self.status
+        return result
+
+
+class EntityNotification(models.Model):
+    """
+    Outbox of the "external-data" notifications sent to the entity.
+
+    A row is written in the same transaction as the issued credential and
+    delivered afterwards by a Celery task, so the wallet does not wait for
+    the entity and failed deliveries are retried instead of being lost.
+    """
+
+    vc_id = models.CharField(
+        _("VC Identifier"), max_length=4000, null=False, unique=True
+    )
+    payload = models.JSONField(_("Payload"))
+    attempts = models.PositiveIntegerField(_("Attempts"), default=0)
+    next_attempt_at = models.DateTimeField(_("Next attempt"), default=timezone.now)
+    delivered_at = models.DateTimeField(_("Delivered at"), null=True, blank=True)
+    last_error = models.TextField(_("Last error"), null=True, blank=True)
+    created_at = models.DateTimeField(_("Created at"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Entity Notification"
+        verbose_name_plural = "Entity Notifications"
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at"],
+                condition=models.Q(delivered_at__isnull=True),
+                name="entity_notification_pending",
+            ),
+            models.Index(
+                fields=["delivered_at"],
+                condition=models.Q(delivered_at__isnull=False),
+                name="entity_notification_delivered",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return self.vc_id
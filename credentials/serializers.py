@@ -88,3 +88,23 @@ class ChangeStatus(serializers.Serializer):
         max_length=255,
         help_text="revoke",
     )
+
+
+class BulkChangeStatus(ChangeStatus):
+    vc_ids = serializers.ListField(
+        child=serializers.CharField(max_length=4000),
+        required=False,
+        help_text="VC Identifiers",
+    )
+    holder = serializers.CharField(
+        max_length=4000, required=False, help_text="Revoke every VC of this DID"
+    )
+    vc_type = serializers.CharField(
+        max_length=4000, required=False, help_text="Revoke every VC of this type"
+    )
+
+
+class BulkChangeStatusResponse(serializers.Serializer):
+    total = serializers.IntegerField()
+    revoked = serializers.IntegerField()
+    failed = serializers.ListField(child=serializers.CharField())
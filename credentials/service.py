@@ -2,22 +2,36 @@ from __future__ import annotations
 
 import base64
 import gzip
+import hashlib
 import json
+import time
 from typing import Any, List
 
-import jwt
-import requests
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
 
-from credentials.constants import EBSI_VC_TYPE
+from common.error.revocation_error import InvalidRevocationEntryError
+from common.services.entity_connector import get_entity_connector
+from common.services.http_client import AsyncHttpClient, HttpClient
+from common.utils.jwt_utils import decode_jwt
 from credentials.models import IssuedVerifiableCredential, StatusList2021
+from credentials.services.entity_notification_service import (
+    EntityNotificationService,
+)
+from credentials.services.revocation_service import (
+    STATUS_LIST_REVOCATION_TYPE,
+    RevocationService,
+)
 from credentials.strategy import CredentialStrategy
 from ebsi.enums import AccreditationTypes
-from ebsi.models import EbsiAccreditationWhiteList
-from ebsi.service import EbsiService
+from ebsi.services.accreditation_white_list_service import (
+    AccreditationWhiteListService,
+)
 from project import settings
 
 from .abstractions import ACredentialService
 from .serializers import (
+    BulkChangeStatus,
     ChangeStatus,
     CredentialResponseSerializer,
     DeferredRegistry,
@@ -29,76 +43,23 @@ from .serializers import (
 
 class CredentialService(ACredentialService):
     @staticmethod
-    def credentials(
+    async def credentials(
         request: list | EbsiCredentialRequestSerializer,
         token: str,
     ) -> List[ResponseSerializer] | ResponseSerializer | None:
         response: ResponseSerializer = {}
         strategy = CredentialStrategy(request, token)
-        credential = None
         # TODO: EBSI requires an did:key for the conformance test but
         # in production it should always be a did:ebsi
-        ebsi_strategy = strategy.ebsi_credentials()
+        ebsi_strategy = await strategy.ebsi_credentials()
         response = {
             "status_code": ebsi_strategy["status_code"],
             "content": ebsi_strategy["content"],
         }
-        credential = ebsi_strategy["credential"]
-
-        if credential:
-            CredentialService.__register_openid_vc_id(credential, token)
-
         return response
 
     @staticmethod
-    def __register_openid_vc_id(credential, token=None):
-        # TODO: This must change in the future. Part of this code should be moved to VC Service
-        # This access_token should be looked at
-
-        types = credential["type"]
-        vc_type = None
-        for type in types:
-            if type not in EBSI_VC_TYPE:
-                vc_type = type
-                break
-
-        pre_code = ""
-        if token:
-            token_decoded = jwt.api_jwt.decode_complete(
-                token.replace("Bearer", "").replace("BEARER", "").lstrip(),
-                "",
-                algorithms=["ES256"],
-                options={"verify_signature": False},
-            )
-            payload = token_decoded.get("payload")
-            if not payload["sub"].startswith("did:"):
-                pre_code = payload["sub"]
-
-        payload = {
-            "vc_id": credential["id"].split("urn:uuid:")[1],
-            "vc_type": vc_type,
-            "pre_code": pre_code,
-            "did": credential["credentialSubject"]["id"],
-            "issuance_date": credential["issuanceDate"],
-            "nbf": credential["validFrom"],
-        }
-        if credential.get("expirationDate") is not None:
-            payload["expiration_date"] = credential.get("expirationDate")
-        try:
-            headers = {}
-            if settings.ENTITY_API_KEY:
-                headers = {"X-API-KEY": settings.ENTITY_API_KEY}
-            requests.request(
-                "POST",
-                settings.ENTITY_URL + "/credentials/external-data",
-                headers=headers,
-                json=payload,
-            )
-        except Exception:
-            pass
-
-    @staticmethod
-    def deferred_credentials(
+    async def deferred_credentials(
         token: str,
     ) -> CredentialResponseSerializer | None:
         url = settings.VC_SERVICE_URL + "/credential_deferred"
@@ -111,21 +72,16 @@ class CredentialService(ACredentialService):
             "issuerDid": settings.DID,
         }
         try:
-            response = requests.request("POST", url, headers=headers, json=payload)
+            response = await AsyncHttpClient.request(
+                "POST", url, headers=headers, json=payload
+            )
         except Exception as e:
             raise Exception(e)
         content = None
         if response.status_code == 200:
             content = json.loads(response.content.decode("utf-8"))
         if "credential" in content:
-            jwt_decoded = jwt.api_jwt.decode_complete(
-                content["credential"],
-                "",
-                algorithms=None,
-                options={"verify_signature": False},
-            )
-            payload = jwt_decoded.get("payload")
-            vc_content = payload["vc"]
+            vc_content = decode_jwt(content["credential"]).payload["vc"]
             vc_types = vc_content["type"]
             credential_status = None
             status_type = None
@@ -141,9 +97,11 @@ class CredentialService(ACredentialService):
                 status=False,
                 revocation_type=status_type,
                 revocation_info=credential_status,
+                holder=vc_content["credentialSubject"]["id"],
+            )
+            await sync_to_async(EntityNotificationService.save_issued_vc)(
+                issued_vc, vc_content
             )
-            issued_vc.save()
-            CredentialService.__register_openid_vc_id(vc_content)
 
         return content
 
@@ -153,117 +111,64 @@ class CredentialService(ACredentialService):
     ) -> ExternalDataResponse | None:
         if vc_type in AccreditationTypes.values():
             # We don't need to ask an external source
-            white_list = EbsiAccreditationWhiteList.objects.filter(
-                type=vc_type, did=user_id
-            ).first()
-            if white_list is None:
+            content = AccreditationWhiteListService.external_data(vc_type, user_id)
+            if content is None:
                 return {
                     "status_code": 403,
                     "content": "Invalid DID for the requested VC",
                 }
-            accredited_for_content = []
-            schemas = white_list.schema.all()
-            terms_of_use = []
-            for information in schemas:
-                if information.accredited_schema is not None:
-                    accredited_for_content.append(
-                        {
-                            "types": information.accredited_for,
-                            "schemaId": information.accredited_schema,
-                        }
-                    )
-                terms_of_use.append(information.attribute_id)
-            body = {
-                "accreditedFor": accredited_for_content,
-                # "reservedAttributeId": "WIP-ATTRIBUTE-ID" # TODO: Change after tasks related to register VCs in EBSI are done
-            }
-            if (
-                vc_type == AccreditationTypes.VerifiableAccreditationToAttest
-                or vc_type == AccreditationTypes.VerifiableAccreditationToAccredit
-            ):
-                attribute_id = EbsiService.trusted_issuer_registry(
-                    user_id, terms_of_use[0], vc_type
-                )
-                body["reservedAttributeId"] = attribute_id
-            content = {"body": body, "termsOfUse": terms_of_use}
             return {"status_code": 200, "content": content}
-        if not settings.ENTITY_URL and settings.DEVELOPER_MOCKUP_ENTITIES:
-            # Return empty data
-            body = {}
-            status_code = 200
-        else:
-            params = {"vc_type": vc_type, "user_id": user_id, "pin": pin}
-            headers = {}
-            if settings.ENTITY_API_KEY:
-                headers = {"X-API-KEY": settings.ENTITY_API_KEY}
-            try:
-                response = requests.request(
-                    "GET",
-                    settings.ENTITY_URL + "/credentials/external-data",
-                    headers=headers,
-                    params=params,
-                    verify=False,
-                )
-            except Exception as e:
-                raise Exception(e)
-
-            body = json.loads(response.content.decode("utf-8"))
-            status_code = response.status_code
+        try:
+            result = get_entity_connector().get_external_data(vc_type, user_id, pin)
+        except Exception as e:
+            raise Exception(e)
 
-        return_dict = {"status_code": status_code, "content": {"body": body}}
+        return_dict = {
+            "status_code": result["status_code"],
+            "content": {"body": result["content"]},
+        }
         return return_dict
 
     @staticmethod
     def register_deferred(request: DeferredRegistry) -> dict:
-        if not settings.ENTITY_URL and settings.DEVELOPER_MOCKUP_ENTITIES:
-            # Return empty data
-            content = "DEV_CODE"
-            status_code = 200
-        else:
-            payload = request
-            try:
-                headers = {}
-                if settings.ENTITY_API_KEY:
-                    headers = {"X-API-KEY": settings.ENTITY_API_KEY}
-                response = requests.request(
-                    "POST",
-                    settings.ENTITY_URL + "/deferred/registry",
-                    headers=headers,
-                    json=payload,
-                )
-            except Exception as e:
-                raise Exception(e)
-
-            content = response.content.decode("utf-8")
-            status_code = response.status_code
-
-        return_dict = {"status_code": status_code, "content": content}
-        return return_dict
+        try:
+            return get_entity_connector().register_deferred(request)
+        except Exception as e:
+            raise Exception(e)
 
     @staticmethod
     def exchange_deferred(code: str) -> dict:
-        if not settings.ENTITY_URL and settings.DEVELOPER_MOCKUP_ENTITIES:
-            # Return empty data
-            content = {"data": {}}
-            status_code = 200
-        else:
-            try:
-                headers = {}
-                if settings.ENTITY_API_KEY:
-                    headers = {"X-API-KEY": settings.ENTITY_API_KEY}
-                response = requests.request(
-                    "GET",
-                    settings.ENTITY_URL + "/deferred/exchange/" + code,
-                    headers=headers,
-                )
-            except Exception as e:
-                raise Exception(e)
-
-            content = json.loads(response.content.decode("utf-8"))
-            status_code = response.status_code
+        try:
+            return get_entity_connector().exchange_deferred(code)
+        except Exception as e:
+            raise Exception(e)
 
-        return_dict = {"status_code": status_code, "content": content}
-        return return_dict
+    @staticmethod
+    def get_status_list_credential(status_list: StatusList2021) -> dict:
+        """
+        Returns the signed credential of the given version of the status list,
+        asking the VC service to sign it only when it isn't cached yet.
+
+        A successful result also has the ``etag`` and ``last_modified`` (epoch
+        seconds) of that signed credential, so they change whenever it is
+        signed again, not only when the list changes.
+        """
+        cache_key = f"signed-status-list:{status_list.id}:{status_list.version}"
+        entry = cache.get(cache_key)
+        if entry is None:
+            result = CredentialService.issue_status_credential(status_list)
+            if result["status_code"] != 200:
+                return result
+            entry = {"content": result["content"], "signed_at": int(time.time())}
+            cache.set(cache_key, entry, settings.STATUS_LIST_CREDENTIAL_TTL)
+
+        digest = hashlib.sha256(entry["content"].encode("utf-8")).hexdigest()
+        return {
+            "status_code": 200,
+            "content": entry["content"],
+            "etag": f'"{status_list.id}-{status_list.version}-{digest[:32]}"',
+            "last_modified": entry["signed_at"],
+        }
 
     @staticmethod
     def issue_status_credential(status_list: StatusList2021) -> dict:
@@ -285,7 +190,7 @@ class CredentialService(ACredentialService):
         }
 
         try:
-            response = requests.request("POST", url, json=params)
+            response = HttpClient.request("POST", url, json=params)
         except Exception as e:
             raise Exception(e)
 
@@ -313,7 +218,7 @@ class CredentialService(ACredentialService):
             "holderDid": holder,
         }
         try:
-            response = requests.request("GET", url, params=params)
+            response = HttpClient.request("GET", url, params=params)
         except Exception as e:
             raise Exception(e)
         return_dict = {
@@ -330,9 +235,38 @@ class CredentialService(ACredentialService):
             return {"status_code": 200, "message": "Previusly Revoked"}
 
         if request.get("status") == "revoked":
+            if vc.revocation_type == STATUS_LIST_REVOCATION_TYPE:
+                try:
+                    vc.status_list_entry()
+                except (KeyError, TypeError, ValueError):
+                    return {"status_code": 400, "message": "Invalid revocation entry"}
             vc.status = True
             vc.save()
         else:
             return {"status_code": 400, "message": "Not a valid Status"}
 
         return {"status_code": 200, "message": "OK"}
+
+    @staticmethod
+    def bulk_change_credential_status(request: BulkChangeStatus) -> dict:
+        if request.get("status") != "revoked":
+            return {"status_code": 400, "message": "Not a valid Status"}
+
+        vc_ids = request.get("vc_ids")
+        holder = request.get("holder")
+        vc_type = request.get("vc_type")
+        if not vc_ids and not holder and not vc_type:
+            return {
+                "status_code": 400,
+                "message": "At least one of vc_ids, holder or vc_type is required",
+            }
+
+        queryset = RevocationService.targets(vc_ids, holder, vc_type)
+        try:
+            result = RevocationService.revoke(queryset)
+        except InvalidRevocationEntryError as e:
+            return {
+                "status_code": 400,
+                "message": {"detail": "Invalid revocation entries", "vc_ids": e.vc_ids},
+            }
+        return {"status_code": 200, "message": result}
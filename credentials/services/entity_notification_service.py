@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from common.services.entity_connector import get_entity_connector
+from common.utils.jwt_utils import decode_bearer_token
+from common.utils.metrics_utils import ENTITY_NOTIFICATIONS_ABANDONED
+from credentials.constants import EBSI_VC_TYPE
+from credentials.models import EntityNotification, IssuedVerifiableCredential
+from credentials.tasks import deliver_entity_notifications
+from project import settings
+
+
+class EntityNotificationService:
+    @staticmethod
+    def build_payload(credential: dict, token: str | None = None) -> dict:
+        # TODO: This must change in the future. Part of this code should be moved to VC Service
+        # This access_token should be looked at
+        vc_type = None
+        for type in credential["type"]:
+            if type not in EBSI_VC_TYPE:
+                vc_type = type
+                break
+
+        pre_code = ""
+        if token:
+            payload = decode_bearer_token(token).payload
+            if not payload["sub"].startswith("did:"):
+                pre_code = payload["sub"]
+
+        payload = {
+            "vc_id": credential["id"].split("urn:uuid:")[1],
+            "vc_type": vc_type,
+            "pre_code": pre_code,
+            "did": credential["credentialSubject"]["id"],
+            "issuance_date": credential["issuanceDate"],
+            "nbf": credential["validFrom"],
+        }
+        if credential.get("expirationDate") is not None:
+            payload["expiration_date"] = credential.get("expirationDate")
+        return payload
+
+    @staticmethod
+    @transaction.atomic
+    def save_issued_vc(
+        issued_vc: IssuedVerifiableCredential,
+        credential: dict,
+        token: str | None = None,
+    ):
+        """
+        Stores the issued credential together with its entity notification.
+        The notification is delivered once the transaction commits.
+        """
+        issued_vc.save()
+        EntityNotification.objects.get_or_create(
+            vc_id=issued_vc.vc_id,
+            defaults={"payload": EntityNotificationService.build_payload(credential, token)},
+        )
+        transaction.on_commit(deliver_entity_notifications.delay, robust=True)
+
+    @staticmethod
+    def deliver_pending() -> int:
+        """
+        Delivers the due notifications in batches until none is left.
+        Returns the number of notifications delivered.
+        """
+        delivered = 0
+        while True:
+            sent, processed = EntityNotificationService._deliver_batch(
+                settings.ENTITY_NOTIFICATION_BATCH_SIZE
+            )
+            delivered += sent
+            if processed < settings.ENTITY_NOTIFICATION_BATCH_SIZE:
+                return delivered
+
+    @staticmethod
+    def _deliver_batch(size: int) -> tuple[int, int]:
+        notifications = EntityNotificationService._claim_batch(size)
+        if not notifications:
+            return 0, 0
+
+        try:
+            errors = get_entity_connector().notify_issued(
+                [notification.payload for notification in notifications]
+            )
+        except Exception as e:
+            errors = [str(e)] * len(notifications)
+        delivered = EntityNotificationService._record_results(notifications, errors)
+        return delivered, len(notifications)
+
+    @staticmethod
+    @transaction.atomic
+    def _claim_batch(size: int) -> list[EntityNotification]:
+        """
+        Leases due notifications to this worker: their attempt is counted and
+        their next attempt moved ENTITY_NOTIFICATION_LEASE seconds ahead, so
+        no other drainer picks them up while they are sent outside of the
+        transaction. They are retried after the lease if this worker dies.
+        """
+        # Rows locked by another drainer are skipped, so each notification
+        # is claimed by a single worker
+        notifications = list(
+            EntityNotification.objects.select_for_update(skip_locked=True)
+            .filter(
+                delivered_at__isnull=True,
+                next_attempt_at__lte=timezone.now(),
+                attempts__lt=settings.ENTITY_NOTIFICATION_MAX_ATTEMPTS,
+            )
+            .order_by("next_attempt_at")[:size]
+        )
+        lease_until = timezone.now() + timedelta(seconds=settings.ENTITY_NOTIFICATION_LEASE)
+        for notification in notifications:
+            notification.attempts += 1
+            notification.next_attempt_at = lease_until
+        EntityNotification.objects.bulk_update(notifications, ["attempts", "next_attempt_at"])
+        return notifications
+
+    @staticmethod
+    def _record_results(notifications: list[EntityNotification], errors: list[str | None]) -> int:
+        delivered = 0
+        abandoned = []
+        for notification, error in zip(notifications, errors):
+            if error is not None:
+                notification.last_error = error
+                notification.next_attempt_at = timezone.now() + timedelta(
+                    seconds=settings.ENTITY_NOTIFICATION_RETRY_DELAY
+                    * 2 ** (notification.attempts - 1)
+                )
+                if notification.attempts >= settings.ENTITY_NOTIFICATION_MAX_ATTEMPTS:
+                    abandoned.append(notification)
+                continue
+            notification.delivered_at = timezone.now()
+            notification.last_error = None
+            delivered += 1
+
+        EntityNotification.objects.bulk_update(
+            notifications, ["next_attempt_at", "delivered_at", "last_error"]
+        )
+        for notification in abandoned:
+            ENTITY_NOTIFICATIONS_ABANDONED.inc()
+            logging.error(
+                "Entity notification %s abandoned after %s attempts: %s",
+                notification.vc_id,
+                notification.attempts,
+                notification.last_error,
+            )
+        return delivered
+
+    @staticmethod
+    def purge_delivered() -> int:
+        """
+        Deletes the notifications delivered more than
+        ENTITY_NOTIFICATION_RETENTION seconds ago, in batches.
+        """
+        purged = 0
+        before = timezone.now() - timedelta(seconds=settings.ENTITY_NOTIFICATION_RETENTION)
+        while True:
+            ids = list(
+                EntityNotification.objects.filter(delivered_at__lte=before).values_list(
+                    "id", flat=True
+                )[: settings.ENTITY_NOTIFICATION_PURGE_BATCH_SIZE]
+            )
+            if not ids:
+                return purged
+            deleted, _ = EntityNotification.objects.filter(id__in=ids).delete()
+            purged += deleted
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+from typing import Callable
+
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.db.models.functions import Now
+
+from common.constants.ebsi_constants import EBSI_RESERVED_TYPES
+from common.error.revocation_error import InvalidRevocationEntryError
+from credentials.models import IssuedVerifiableCredential, StatusList2021
+from credentials.tasks import refresh_status_list_credential
+from ebsi.constants import EBSI_ACCREDITATION_REVOCATION_TYPE
+from ebsi.models import PotentialAccreditationInformation
+from ebsi.service import EbsiService
+
+STATUS_LIST_REVOCATION_TYPE = "StatusList2021Entry"
+
+
+class RevocationService:
+    @staticmethod
+    def accreditation_revocation_params(
+        vc: IssuedVerifiableCredential, attributes: dict | None = None
+    ) -> tuple[str, str, str]:
+        """
+        Returns the (holder, attribute id, revision id) needed to revoke an
+        EBSI accreditation. ``attributes`` memoises the attribute id of each
+        accreditation type across calls.
+        """
+        if attributes is None:
+            attributes = {}
+        vc_type = [element for element in vc.vc_type if element not in EBSI_RESERVED_TYPES][0]
+        if vc_type not in attributes:
+            potential_accreditation = PotentialAccreditationInformation.objects.filter(
+                type=vc_type
+            ).first()
+            if potential_accreditation is None:
+                raise Exception("No accreditation attributes available")
+            attributes[vc_type] = potential_accreditation.attribute_id
+        revision_id = re.search(r"0x[0-9a-fA-F]+", vc.revocation_info.get("id")).group()
+        return vc.holder, attributes[vc_type], revision_id
+
+    @staticmethod
+    def targets(
+        vc_ids: list[str] | None = None,
+        holder: str | None = None,
+        vc_type: str | None = None,
+    ) -> QuerySet:
+        queryset = IssuedVerifiableCredential.objects.all()
+        if vc_ids:
+            queryset = queryset.filter(vc_id__in=vc_ids)
+        if holder:
+            queryset = queryset.filter(holder=holder)
+        if vc_type:
+            queryset = queryset.filter(vc_type__contains=[vc_type])
+        return queryset
+
+    @staticmethod
+    def revoke(queryset: QuerySet, progress: Callable[[str, int, int], None] | None = None) -> dict:
+        """
+        Revokes every credential of the queryset that is not revoked yet.
+
+        StatusList2021 entries are grouped by list and every list is rewritten
+        once, under a row lock, with all its bits set. EBSI accreditations are
+        revoked through the RPC service in JSON-RPC batches. ``progress`` is called
+        after every step with a label, the revoked count and the total.
+
+        Raises InvalidRevocationEntryError, before revoking anything, if a
+        status list entry is malformed or out of its list.
+        """
+        status_list_entries = defaultdict(list)
+        accreditations = []
+        others = []
+        invalid = []
+        for vc in queryset.filter(status=False).iterator(chunk_size=2000):
+            if vc.revocation_type == STATUS_LIST_REVOCATION_TYPE:
+                try:
+                    list_id, index = vc.status_list_entry()
+                except (KeyError, TypeError, ValueError):
+                    invalid.append(vc.vc_id)
+                    continue
+                status_list_entries[list_id].append((vc.vc_id, index))
+            elif vc.revocation_type == EBSI_ACCREDITATION_REVOCATION_TYPE:
+                accreditations.append(vc)
+            else:
+                others.append(vc.vc_id)
+        if invalid:
+            raise InvalidRevocationEntryError(invalid)
+
+        total = (
+            sum(len(entries) for entries in status_list_entries.values())
+            + len(accreditations)
+            + len(others)
+        )
+        revoked = 0
+        failed = []
+
+        def report(label):
+            if progress is not None:
+                progress(label, revoked, total)
+
+        for list_id, entries in status_list_entries.items():
+            if RevocationService._revoke_status_list_entries(list_id, entries):
+                revoked += len(entries)
+            else:
+                failed.extend(vc_id for vc_id, _ in entries)
+            report(f"Status list {list_id}")
+
+        if accreditations:
+            succeeded, accreditation_failures = RevocationService._revoke_accreditations(
+                accreditations
+            )
+            IssuedVerifiableCredential.objects.filter(vc_id__in=succeeded).update(status=True)
+            revoked += len(succeeded)
+            failed.extend(accreditation_failures)
+            report("EBSI accreditations")
+
+        if others:
+            IssuedVerifiableCredential.objects.filter(vc_id__in=others).update(status=True)
+            revoked += len(others)
+            report("Credentials without revocation entry")
+
+        return {"total": total, "revoked": revoked, "failed": failed}
+
+    @staticmethod
+    def _revoke_status_list_entries(list_id: str, entries: list) -> bool:
+        with transaction.atomic():
+            status_list = StatusList2021.objects.select_for_update().filter(id=list_id).first()
+            if status_list is None:
+                return False
+            content = bytearray(status_list.content)
+            for _, index in entries:
+                content[index // 8] |= 128 >> (index % 8)
+            StatusList2021.objects.filter(id=list_id).update(
+                content=content, version=F("version") + 1, last_modified=Now()
+            )
+            IssuedVerifiableCredential.objects.filter(
+                vc_id__in=[vc_id for vc_id, _ in entries]
+            ).update(status=True)
+            transaction.on_commit(
+                lambda: refresh_status_list_credential.delay(list_id), robust=True
+            )
+        return True
+
+    @staticmethod
+    def _revoke_accreditations(accreditations: list) -> tuple[list, list]:
+        attributes = {}
+        requests = []
+        failed = []
+        for vc in accreditations:
+            try:
+                requests.append(
+                    (
+                        vc.vc_id,
+                        RevocationService.accreditation_revocation_params(vc, attributes),
+                    )
+                )
+            except Exception:
+                failed.append(vc.vc_id)
+
+        try:
+            results = EbsiService.revoke_accreditations([params for _, params in requests])
+        except Exception:
+            return [], failed + [vc_id for vc_id, _ in requests]
+
+        succeeded = []
+        for (vc_id, _), result in zip(requests, results):
+            (failed if "error" in result else succeeded).append(vc_id)
+        return succeeded, failed
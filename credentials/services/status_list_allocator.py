@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import os
+import threading
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from common.utils.sentry_utils import span
+from credentials.constants import STATUS_LIST_CAPACITY
+from credentials.models import StatusList2021
+from project import settings
+
+# Arbitrary key of the advisory lock that serialises the creation of lists
+STATUS_LIST_CREATION_LOCK = 2021
+
+
+class StatusListAllocator:
+    """
+    Hands out unique (status list, index) pairs for StatusList2021 revocation.
+
+    ``STATUS_LIST_SHARDS`` lists are kept open at the same time. Each worker
+    process starts on its own list and moves round-robin over the open ones,
+    so allocations and later revocations spread their writes over several
+    rows. A list keeps being used until all its indices are assigned.
+
+    Indices are reserved in blocks of ``STATUS_LIST_BLOCK_SIZE``: the block is
+    taken from the database under a row lock (``SELECT ... FOR UPDATE SKIP
+    LOCKED``), so two workers can never receive the same index, and then it is
+    served from memory until it runs out. ``current_index`` is the last index
+    assigned from a list, None for a new list. Indices of a block that is not fully
+    used before the process stops are simply never assigned.
+    """
+
+    _lock = threading.Lock()
+    _pid: int = None
+    _reservations: int = 0
+    _list_id: int = None
+    _next_index: int = 0
+    _last_index: int = -1
+
+    @staticmethod
+    def allocate() -> tuple[int, int]:
+        cls = StatusListAllocator
+        with cls._lock:
+            if cls._pid != os.getpid():
+                # A forked worker must not reuse the block of its parent
+                cls._pid = os.getpid()
+                cls._reservations = 0
+                cls._last_index = -1
+                cls._next_index = 0
+            if cls._next_index > cls._last_index:
+                shard = cls._pid + cls._reservations
+                cls._reservations += 1
+                with span("status_list.allocate", "reserve status list block"):
+                    cls._list_id, cls._next_index, cls._last_index = cls._reserve_block(
+                        settings.STATUS_LIST_BLOCK_SIZE, shard
+                    )
+            index = cls._next_index
+            cls._next_index += 1
+            return cls._list_id, index
+
+    @staticmethod
+    def _open_lists():
+        return (
+            StatusList2021.objects.filter(
+                Q(current_index__isnull=True) | Q(current_index__lt=STATUS_LIST_CAPACITY - 1)
+            )
+            .only("id", "current_index")
+            .order_by("id")
+        )
+
+    @staticmethod
+    def _open_list_ids(shards: int) -> list[int]:
+        list_ids = list(StatusListAllocator._open_lists().values_list("id", flat=True)[:shards])
+        if len(list_ids) < shards:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [STATUS_LIST_CREATION_LOCK])
+            list_ids = list(StatusListAllocator._open_lists().values_list("id", flat=True)[:shards])
+            for _ in range(shards - len(list_ids)):
+                # No index assigned yet: the first block starts at 0
+                status_list = StatusList2021(current_index=None)
+                status_list.save()
+                list_ids.append(status_list.id)
+        return list_ids
+
+    @staticmethod
+    @transaction.atomic
+    def _reserve_block(size: int, shard: int) -> tuple[int, int, int]:
+        status_list = None
+        while status_list is None:
+            list_ids = StatusListAllocator._open_list_ids(max(settings.STATUS_LIST_SHARDS, 1))
+            start = shard % len(list_ids)
+            preferred = list_ids[start:] + list_ids[:start]
+            for list_id in preferred:
+                status_list = (
+                    StatusListAllocator._open_lists()
+                    .filter(id=list_id)
+                    .select_for_update(skip_locked=True)
+                    .first()
+                )
+                if status_list is not None:
+                    break
+            else:
+                # Every open list is being reserved by another worker. The
+                # list may be full once the lock is granted, then start over.
+                status_list = (
+                    StatusListAllocator._open_lists()
+                    .filter(id=preferred[0])
+                    .select_for_update()
+                    .first()
+                )
+
+        # current_index is the last index assigned from the list
+        if status_list.current_index is None:
+            first_index = 0
+        else:
+            first_index = status_list.current_index + 1
+        last_index = min(first_index + size, STATUS_LIST_CAPACITY) - 1
+        StatusList2021.objects.filter(id=status_list.id).update(current_index=last_index)
+        return status_list.id, first_index, last_index
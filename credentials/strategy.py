@@ -1,12 +1,13 @@
 import json
 from typing import List
 
-import jwt
-import requests
+from asgiref.sync import sync_to_async
 from django.core.exceptions import BadRequest
 from django.utils.translation import gettext_lazy as _
 
 from common.constants.ebsi_constants import EBSI_RESERVED_TYPES
+from common.services.http_client import AsyncHttpClient
+from common.utils.jwt_utils import decode_jwt
 from credentials.serializers import (
     CredentialResponseSerializer,
     EbsiCredentialRequestSerializer,
@@ -16,7 +17,9 @@ from openid.enums import RevocationTypes
 from openid.models import IssuanceFlow
 from project import settings
 
-from .models import IssuedVerifiableCredential, StatusList2021
+from .models import IssuedVerifiableCredential
+from .services.entity_notification_service import EntityNotificationService
+from .services.status_list_allocator import StatusListAllocator
 
 
 class CredentialStrategy:
@@ -27,7 +30,7 @@ class CredentialStrategy:
     def _ebsi_get_specific_type(types: List[str]) -> List[str]:
         return [element for element in types if element not in EBSI_RESERVED_TYPES]
 
-    def ebsi_credentials(self) -> CredentialResponseSerializer:
+    async def ebsi_credentials(self) -> CredentialResponseSerializer:
         url = settings.VC_SERVICE_URL + "/credentials"
         request_post: EbsiCredentialRequestSerializer = self.request.data
         headers = {
@@ -48,54 +51,41 @@ class CredentialStrategy:
         if len(vc_specific_types) != 1:
             raise BadRequest(_("Invalid credential types"))
 
-        scope_action = IssuanceFlow.objects.filter(
+        scope_action = await IssuanceFlow.objects.filter(
             credential_types=vc_specific_types[0]
-        ).first()
+        ).afirst()
         if scope_action:
             if scope_action.revocation == RevocationTypes.status_list_2021.name:
-                proxy = ProxyAPIs.objects.first()
+                proxy = await ProxyAPIs.objects.afirst()
                 if not proxy:
                     return {
                         "status_code": 500,
                         "content": "The requested VC can't be issued at this momment ",
                     }
                 # Reserve index for StatusList
-                next_index = None
-                status_list = StatusList2021.objects.all()
-                status_list = status_list.latest("id")
-                if status_list.current_index == 16 * 1024 * 8 - 1:
-                    # The list is full
-                    status_list = StatusList2021()
-                    next_index = 0
-                else:
-                    next_index = status_list.current_index + 1
-                status_list.current_index = next_index
-                status_list.save()
+                list_id, next_index = await sync_to_async(
+                    StatusListAllocator.allocate
+                )()
                 payload["listIndex"] = next_index
-                payload["listId"] = "/credentials/status/list/" + str(status_list.id)
+                payload["listId"] = "/credentials/status/list/" + str(list_id)
                 payload["listProxy"] = proxy.proxy_id
         else:
-            accreditation = PotentialAccreditationInformation.objects.filter(
+            accreditation = await PotentialAccreditationInformation.objects.filter(
                 type=vc_specific_types[0]
-            ).first()
+            ).afirst()
             if not accreditation:
                 raise BadRequest(_("Invalid credential types"))
 
         try:
-            response = requests.request("POST", url, headers=headers, json=payload)
+            response = await AsyncHttpClient.request(
+                "POST", url, headers=headers, json=payload
+            )
         except Exception as e:
             raise Exception(e)
         content = json.loads(response.content.decode("utf-8"))
         credential = None
         if "credential" in content:
-            jwt_decoded = jwt.api_jwt.decode_complete(
-                content["credential"],
-                "",
-                algorithms=["ES256"],
-                options={"verify_signature": False},
-            )
-            payload = jwt_decoded.get("payload")
-            vc_content = payload["vc"]
+            vc_content = decode_jwt(content["credential"]).payload["vc"]
             credential = vc_content
             credential_status = None
             status_type = None
@@ -113,7 +103,9 @@ class CredentialStrategy:
                 revocation_info=credential_status,
                 holder=vc_content["credentialSubject"]["id"],
             )
-            issued_vc.save()
+            await sync_to_async(EntityNotificationService.save_issued_vc)(
+                issued_vc, vc_content, self.token
+            )
 
         return_dict = {
             "status_code": response.status_code,
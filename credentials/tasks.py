@@ -0,0 +1,29 @@
+from celery import shared_task
+
+
+@shared_task()
+def refresh_status_list_credential(list_id: str):
+    from credentials.models import StatusList2021
+    from credentials.service import CredentialService
+
+    status_list = StatusList2021.objects.filter(id=list_id).first()
+    if status_list is not None:
+        CredentialService.get_status_list_credential(status_list)
+
+
+@shared_task()
+def deliver_entity_notifications():
+    from credentials.services.entity_notification_service import (
+        EntityNotificationService,
+    )
+
+    return EntityNotificationService.deliver_pending()
+
+
+@shared_task()
+def purge_delivered_entity_notifications():
+    from credentials.services.entity_notification_service import (
+        EntityNotificationService,
+    )
+
+    return EntityNotificationService.purge_delivered()
@@ -1,3 +1,421 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from common.error.revocation_error import InvalidRevocationEntryError
+from common.tests.query_plan_test_case import QueryPlanTestCase
+from credentials.constants import STATUS_LIST_CAPACITY
+from credentials.models import (
+    EntityNotification,
+    IssuedVerifiableCredential,
+    StatusList2021,
+    VerifiableCredential,
+)
+from credentials.service import CredentialService
+from credentials.services.entity_notification_service import (
+    EntityNotificationService,
+)
+from credentials.services.revocation_service import RevocationService
+from credentials.services.status_list_allocator import StatusListAllocator
+from project import settings
+
+
+class HotQueryPlanTests(QueryPlanTestCase):
+    def test_issued_credential_by_holder(self):
+        self.assertUsesIndex(
+            IssuedVerifiableCredential.objects.filter(holder="did:key:z123")
+        )
+
+    def test_issued_credential_by_type(self):
+        self.assertUsesIndex(
+            IssuedVerifiableCredential.objects.filter(
+                vc_type__contains=["VerifiableId"]
+            )
+        )
+
+    def test_verifiable_credential_by_type(self):
+        self.assertUsesIndex(
+            VerifiableCredential.objects.filter(
+                types__contains=["VerifiableAccreditationToAttest"]
+            )
+        )
+
+    def test_verifiable_credential_by_holder(self):
+        self.assertUsesIndex(
+            VerifiableCredential.objects.filter(holder_did="did:ebsi:z123")
+        )
+
+    def test_verifiable_credential_by_attribute_id(self):
+        self.assertUsesIndex(
+            VerifiableCredential.objects.filter(reserved_attribute_id="0x1234")
+        )
+
+    def test_pending_entity_notifications(self):
+        self.assertUsesIndex(
+            EntityNotification.objects.filter(
+                delivered_at__isnull=True, next_attempt_at__lte="2024-01-01"
+            ).order_by("next_attempt_at")
+        )
+
+
+class EntityNotificationDeliveryTests(TestCase):
+    def setUp(self):
+        self.connector = mock.Mock()
+        self.connector.notify_issued.side_effect = lambda payloads: [
+            None
+        ] * len(payloads)
+        patcher = mock.patch(
+            "credentials.services.entity_notification_service.get_entity_connector",
+            return_value=self.connector,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def notification(**kwargs) -> EntityNotification:
+        return EntityNotification.objects.create(
+            vc_id=kwargs.pop("vc_id", "vc-1"), payload={"vc_id": "vc-1"}, **kwargs
+        )
+
+    def test_delivered(self):
+        notification = self.notification()
+        self.assertEqual(EntityNotificationService.deliver_pending(), 1)
+        notification.refresh_from_db()
+        self.assertIsNotNone(notification.delivered_at)
+        self.assertEqual(notification.attempts, 1)
+        self.assertEqual(EntityNotificationService.deliver_pending(), 0)
+
+    def test_retried_with_backoff(self):
+        self.connector.notify_issued.side_effect = lambda payloads: ["boom"] * len(
+            payloads
+        )
+        notification = self.notification()
+        for attempt in (1, 2, 3):
+            start = timezone.now()
+            EntityNotificationService.deliver_pending()
+            notification.refresh_from_db()
+            self.assertEqual(notification.attempts, attempt)
+            self.assertEqual(notification.last_error, "boom")
+            self.assertIsNone(notification.delivered_at)
+            delay = settings.ENTITY_NOTIFICATION_RETRY_DELAY * 2 ** (attempt - 1)
+            self.assertGreaterEqual(
+                notification.next_attempt_at, start + timedelta(seconds=delay)
+            )
+            # Not due yet
+            EntityNotificationService.deliver_pending()
+            self.assertEqual(
+                EntityNotification.objects.get(pk=notification.pk).attempts, attempt
+            )
+            EntityNotification.objects.filter(pk=notification.pk).update(
+                next_attempt_at=timezone.now()
+            )
+
+    def test_connector_error_is_retried(self):
+        self.connector.notify_issued.side_effect = ConnectionError("down")
+        notification = self.notification()
+        EntityNotificationService.deliver_pending()
+        notification.refresh_from_db()
+        self.assertEqual(notification.attempts, 1)
+        self.assertEqual(notification.last_error, "down")
+
+    def test_abandoned_after_max_attempts(self):
+        self.connector.notify_issued.side_effect = lambda payloads: ["boom"] * len(
+            payloads
+        )
+        notification = self.notification(
+            attempts=settings.ENTITY_NOTIFICATION_MAX_ATTEMPTS - 1
+        )
+        with self.assertLogs(level="ERROR") as logs:
+            EntityNotificationService.deliver_pending()
+        self.assertIn(notification.vc_id, logs.output[0])
+        EntityNotification.objects.filter(pk=notification.pk).update(
+            next_attempt_at=timezone.now()
+        )
+        EntityNotificationService.deliver_pending()
+        self.assertEqual(self.connector.notify_issued.call_count, 1)
+
+    def test_leased_while_sending(self):
+        self.notification()
+        claimed = []
+        self.connector.notify_issued.side_effect = lambda payloads: (
+            claimed.extend(EntityNotificationService._claim_batch(10))
+            or [None] * len(payloads)
+        )
+        self.assertEqual(EntityNotificationService.deliver_pending(), 1)
+        self.assertEqual(claimed, [])
+
+    def test_purge_delivered(self):
+        old = timezone.now() - timedelta(
+            seconds=settings.ENTITY_NOTIFICATION_RETENTION + 1
+        )
+        self.notification(vc_id="old", delivered_at=old)
+        self.notification(vc_id="recent", delivered_at=timezone.now())
+        self.notification(vc_id="pending")
+        self.assertEqual(EntityNotificationService.purge_delivered(), 1)
+        self.assertEqual(
+            set(EntityNotification.objects.values_list("vc_id", flat=True)),
+            {"recent", "pending"},
+        )
+
+
+class EntityNotificationDrainerTests(TransactionTestCase):
+    def test_each_notification_claimed_once(self):
+        for n in range(20):
+            EntityNotification.objects.create(vc_id=f"vc-{n}", payload={})
+        barrier = threading.Barrier(4)
+        claims = []
+
+        def drain():
+            try:
+                barrier.wait()
+                claims.append(
+                    [n.pk for n in EntityNotificationService._claim_batch(20)]
+                )
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=drain) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        claimed = [pk for claim in claims for pk in claim]
+        self.assertEqual(len(claimed), len(set(claimed)))
+        self.assertEqual(len(claimed), 20)
+        self.assertEqual(
+            EntityNotification.objects.filter(attempts=1).count(), 20
+        )
+
+
+class StatusListAllocatorTests(TestCase):
+    def setUp(self):
+        # Every test starts without a block in memory
+        StatusListAllocator._pid = None
+        self.addCleanup(setattr, StatusListAllocator, "_pid", None)
+        for name, value in (("STATUS_LIST_BLOCK_SIZE", 4), ("STATUS_LIST_SHARDS", 1)):
+            patcher = mock.patch.object(settings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_new_list_starts_at_zero(self):
+        list_id, index = StatusListAllocator.allocate()
+        self.assertEqual(index, 0)
+        self.assertEqual(StatusList2021.objects.get(id=list_id).current_index, 3)
+
+    def test_blocks_are_contiguous(self):
+        allocations = [StatusListAllocator.allocate() for _ in range(10)]
+        self.assertEqual([index for _, index in allocations], list(range(10)))
+        self.assertEqual(len({list_id for list_id, _ in allocations}), 1)
+        # Three blocks of 4 were reserved
+        self.assertEqual(StatusList2021.objects.get().current_index, 11)
+
+    def test_existing_list_continues_after_current_index(self):
+        status_list = StatusList2021(current_index=0)
+        status_list.save()
+        self.assertEqual(StatusListAllocator.allocate(), (status_list.id, 1))
+
+    def test_shards_spread_over_open_lists(self):
+        with mock.patch.object(settings, "STATUS_LIST_SHARDS", 3):
+            blocks = [
+                StatusListAllocator._reserve_block(4, shard) for shard in range(4)
+            ]
+        list_ids = [list_id for list_id, _, _ in blocks]
+        self.assertEqual(len(set(list_ids[:3])), 3)
+        # The fourth shard wraps around to the first list
+        self.assertEqual(blocks[3], (list_ids[0], 4, 7))
+        self.assertEqual(StatusList2021.objects.count(), 3)
+
+    def test_full_list_rolls_over(self):
+        with mock.patch(
+            "credentials.services.status_list_allocator.STATUS_LIST_CAPACITY", 6
+        ):
+            allocations = [StatusListAllocator.allocate() for _ in range(8)]
+        first_list, second_list = sorted({list_id for list_id, _ in allocations})
+        self.assertEqual(
+            allocations,
+            [(first_list, n) for n in range(6)] + [(second_list, 0), (second_list, 1)],
+        )
+        self.assertEqual(StatusList2021.objects.get(id=first_list).current_index, 5)
+
+
+class StatusListAllocatorConcurrencyTests(TransactionTestCase):
+    def test_concurrent_blocks_are_disjoint(self):
+        workers = 8
+        barrier = threading.Barrier(workers)
+        blocks = []
+
+        def reserve(shard):
+            try:
+                barrier.wait()
+                for _ in range(5):
+                    blocks.append(StatusListAllocator._reserve_block(10, shard))
+            finally:
+                connection.close()
+
+        with mock.patch.object(settings, "STATUS_LIST_SHARDS", 3):
+            threads = [
+                threading.Thread(target=reserve, args=(shard,))
+                for shard in range(workers)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        indices = [
+            (list_id, index)
+            for list_id, first, last in blocks
+            for index in range(first, last + 1)
+        ]
+        self.assertEqual(len(blocks), workers * 5)
+        self.assertEqual(len(indices), workers * 5 * 10)
+        self.assertEqual(len(set(indices)), len(indices))
+        self.assertEqual(StatusList2021.objects.count(), 3)
+
+
+
+class RevocationTests(TestCase):
+    def setUp(self):
+        self.lists = []
+        for _ in range(2):
+            status_list = StatusList2021(current_index=None)
+            status_list.save()
+            self.lists.append(status_list)
+
+    def credential(self, vc_id, status_list=None, index=0, status=False):
+        revocation_type, revocation_info = None, None
+        if status_list is not None:
+            revocation_type = "StatusList2021Entry"
+            revocation_info = {
+                "statusListCredential": "https://issuer.example.org"
+                f"/credentials/status/list/{status_list.id}",
+                "statusListIndex": str(index),
+            }
+        return IssuedVerifiableCredential.objects.create(
+            vc_id=vc_id,
+            vc_type=["VerifiableCredential", "VerifiableId"],
+            issuance_date=timezone.now(),
+            holder="did:key:z123",
+            status=status,
+            revocation_type=revocation_type,
+            revocation_info=revocation_info,
+        )
+
+    @staticmethod
+    def revoked_bits(status_list) -> list[int]:
+        content = StatusList2021.objects.get(id=status_list.id).content
+        return [
+            index
+            for index in range(len(content) * 8)
+            if content[index // 8] & (128 >> index % 8)
+        ]
+
+    def test_bit_set_only_when_revoked(self):
+        vc = self.credential("vc-1", self.lists[0], 9)
+        with mock.patch.object(
+            StatusList2021, "set_revoked", wraps=StatusList2021.set_revoked
+        ) as set_revoked:
+            vc.save()
+            vc.status = True
+            vc.save()
+            vc.save()
+            IssuedVerifiableCredential.objects.get(vc_id="vc-1").save()
+        set_revoked.assert_called_once_with(str(self.lists[0].id), 9)
+        self.assertEqual(self.revoked_bits(self.lists[0]), [9])
+
+    def test_bulk_revoke(self):
+        self.credential("a-0", self.lists[0], 0)
+        self.credential("a-7", self.lists[0], 7)
+        self.credential("a-8", self.lists[0], 8)
+        self.credential("b-last", self.lists[1], STATUS_LIST_CAPACITY - 1)
+        self.credential("b-revoked", self.lists[1], 3, status=True)
+        self.credential("plain")
+        progress = mock.Mock()
+        result = RevocationService.revoke(
+            RevocationService.targets(holder="did:key:z123"), progress
+        )
+        self.assertEqual(result, {"total": 5, "revoked": 5, "failed": []})
+        self.assertEqual(self.revoked_bits(self.lists[0]), [0, 7, 8])
+        # b-revoked set its bit when it was created
+        self.assertEqual(
+            self.revoked_bits(self.lists[1]), [3, STATUS_LIST_CAPACITY - 1]
+        )
+        self.assertFalse(
+            IssuedVerifiableCredential.objects.filter(status=False).exists()
+        )
+        self.assertEqual(progress.call_args.args[1:], (5, 5))
+        self.assertEqual(
+            StatusList2021.objects.get(id=self.lists[0].id).version,
+            self.lists[0].version + 1,
+        )
+
+    def test_bulk_revoke_out_of_range_index(self):
+        self.credential("valid", self.lists[0], 1)
+        self.credential("invalid", self.lists[0], STATUS_LIST_CAPACITY)
+        with self.assertRaises(InvalidRevocationEntryError) as raised:
+            RevocationService.revoke(
+                RevocationService.targets(vc_ids=["valid", "invalid"])
+            )
+        self.assertEqual(raised.exception.vc_ids, ["invalid"])
+        self.assertEqual(self.revoked_bits(self.lists[0]), [])
+
+        result = CredentialService.bulk_change_credential_status(
+            {"status": "revoked", "vc_ids": ["valid", "invalid"]}
+        )
+        self.assertEqual(result["status_code"], 400)
+        self.assertEqual(result["message"]["vc_ids"], ["invalid"])
+        self.assertFalse(
+            IssuedVerifiableCredential.objects.filter(status=True).exists()
+        )
+
+    def test_revoke_out_of_range_index(self):
+        vc = self.credential("invalid", self.lists[0], -1)
+        result = CredentialService.change_credential_status(vc, {"status": "revoked"})
+        self.assertEqual(result["status_code"], 400)
+        self.assertFalse(IssuedVerifiableCredential.objects.get(vc_id="invalid").status)
+
+
+class StatusListCredentialTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.status_list = StatusList2021(current_index=None)
+        self.status_list.save()
+        self.url = f"/credentials/status/list/{self.status_list.id}/"
+        self.signatures = 0
+        patcher = mock.patch.object(
+            CredentialService, "issue_status_credential", side_effect=self.sign
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sign(self, status_list):
+        self.signatures += 1
+        return {"status_code": 200, "content": f"eyJ.signed-{self.signatures}"}
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.content, b"eyJ.signed-1")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.signatures, 1)
+
+    def test_signed_again_changes_the_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        # The signed credential expired from the cache, the list is unchanged
+        cache.clear()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"eyJ.signed-2")
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_revocation_changes_the_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        StatusList2021.set_revoked(self.status_list.id, 3)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.signatures, 2)
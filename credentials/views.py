@@ -1,7 +1,10 @@
 from typing import Any
 
+from adrf.viewsets import ViewSet as AsyncViewSet
 from django.http import HttpResponse
 from django.http.response import HttpResponseBadRequest, HttpResponseNotFound
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.authentication import BasicAuthentication, SessionAuthentication
@@ -23,6 +26,8 @@ from credentials.service import CredentialService
 from project import settings
 
 from .serializers import (
+    BulkChangeStatus,
+    BulkChangeStatusResponse,
     ChangeStatus,
     CredentialResponseSerializer,
     DeferredRegistry,
@@ -37,7 +42,7 @@ from .serializers import (
 
 
 # Create your views here.
-class CredentialsView(ViewSet):
+class CredentialsView(AsyncViewSet):
     permission_classes = (AllowAny,)
     parser_classes = [JSONParser, FormParser, MultiPartParser]
 
@@ -57,8 +62,8 @@ class CredentialsView(ViewSet):
         responses={200: openapi.Response("", CredentialResponseSerializer)},
     )
     @action(detail=False, methods=["post"], url_path="credentials")
-    def credentials(self, request):
-        credentials = CredentialService.credentials(
+    async def credentials(self, request):
+        credentials = await CredentialService.credentials(
             request,
             request.headers.get("Authorization"),
         )
@@ -84,8 +89,8 @@ class CredentialsView(ViewSet):
         responses={200: openapi.Response("", CredentialResponseSerializer)},
     )
     @action(detail=False, methods=["post"], url_path="credential_deferred")
-    def deferred_credentials(self, request):
-        deferred_credentials = CredentialService.deferred_credentials(
+    async def deferred_credentials(self, request):
+        deferred_credentials = await CredentialService.deferred_credentials(
             request.headers.get("Authorization"),
         )
         if deferred_credentials:
@@ -211,16 +216,35 @@ class CredentialsView(ViewSet):
         url_path="credentials/status/list/(?P<list_id>[\\w-]+)",
     )
     def credential_status(self, request, list_id: str):
-        status_list = StatusList2021.objects.filter(id=list_id).first()
+        status_list = (
+            StatusList2021.objects.filter(id=list_id).only("id", "version").first()
+        )
         if not status_list:
             return HttpResponseNotFound(
                 "Status list " + list_id + " for issuer " + " not found"
             )
-        result = CredentialService.issue_status_credential(status_list)
+        # Validators come from the signed credential: it changes when the list
+        # changes and also when it is signed again after expiring
+        result = CredentialService.get_status_list_credential(status_list)
         code = result.get("status_code")
-        content = result.get("content")
+        if code != 200:
+            return HttpResponse(
+                result.get("content"), status=code, content_type="text/plain"
+            )
+        response = get_conditional_response(
+            request, etag=result["etag"], last_modified=result["last_modified"]
+        )
+        if response is None:
+            response = HttpResponse(
+                result["content"], status=code, content_type="text/plain"
+            )
 
-        return HttpResponse(content, status=code, content_type="text/plain")
+        response.headers["ETag"] = result["etag"]
+        response.headers["Last-Modified"] = http_date(result["last_modified"])
+        patch_cache_control(
+            response, public=True, max_age=settings.STATUS_LIST_CACHE_MAX_AGE
+        )
+        return response
 
     @swagger_auto_schema(
         method="get",
@@ -388,3 +412,22 @@ class CredentialAuthView(ViewSet):
             message,
             status=code,
         )
+
+    @swagger_auto_schema(
+        method="put",
+        request_body=BulkChangeStatus,
+        operation_description="Put the status of several Issued Credentials at once",
+        responses={200: BulkChangeStatusResponse},
+    )
+    @action(detail=False, methods=["put"], url_path="credentials/status")
+    def bulk_change_credential_status(self, request: Any):
+        serializer = BulkChangeStatus(data=request.data)
+        if not serializer.is_valid():
+            return HttpResponseBadRequest(str(serializer.errors))
+        result = CredentialService.bulk_change_credential_status(
+            serializer.validated_data
+        )
+        return Response(
+            result.get("message"),
+            status=result.get("status_code"),
+        )
@@ -0,0 +1,33 @@
+# Generated by Django 5.1 on 2026-10-18 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ebsi', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ebsiaccreditation',
+            name='type',
+            field=models.CharField(choices=[('VerifiableAuthorisationToOnboard', 'VerifiableAuthorisationToOnboard'), ('VerifiableAccreditationToAttest', 'VerifiableAccreditationToAttest'), ('VerifiableAccreditationToAccredit', 'VerifiableAccreditationToAccredit'), ('VerifiableAccreditationForTrustChain', 'VerifiableAuthorisationForTrustChain')], db_index=True, max_length=100, verbose_name='Accreditation Type'),
+        ),
+        migrations.AlterField(
+            model_name='ebsitermsofuse',
+            name='attribute_id',
+            field=models.CharField(db_index=True, max_length=4000, null=True, verbose_name='Attribute ID'),
+        ),
+        migrations.AlterField(
+            model_name='potentialaccreditationinformation',
+            name='attribute_id',
+            field=models.CharField(db_index=True, max_length=4000, null=True, verbose_name='Attribute ID'),
+        ),
+        migrations.AlterField(
+            model_name='potentialaccreditationinformation',
+            name='type',
+            field=models.CharField(db_index=True, max_length=2000, verbose_name='type'),
+        ),
+    ]
@@ -16,7 +16,9 @@ class EbsiTermsOfUse(models.Model):
         verbose_name=_("VC Type"),
     )
     vc_schema = models.CharField(max_length=1000, null=True)
-    attribute_id = models.CharField(_("Attribute ID"), max_length=4000, null=True)
+    attribute_id = models.CharField(
+        _("Attribute ID"), max_length=4000, null=True, db_index=True
+    )
     vc = models.ForeignKey(
         "credentials.VerifiableCredential", on_delete=models.CASCADE, null=False
     )
@@ -33,6 +35,7 @@ class EbsiAccreditation(models.Model):
         max_length=100,
         null=False,
         blank=False,
+        db_index=True,
     )
     token = models.CharField(
         _("Response Type"),
@@ -59,7 +62,7 @@ class EbsiAccreditation(models.Model):
 
 
 class PotentialAccreditationInformation(models.Model):
-    type = models.CharField(_("type"), max_length=2000, null=False)
+    type = models.CharField(_("type"), max_length=2000, null=False, db_index=True)
     accredited_for = ArrayField(
         models.CharField(
             max_length=100,
@@ -69,7 +72,9 @@ class PotentialAccreditationInformation(models.Model):
     accredited_schema = models.CharField(
         _("Accredited Schema"), max_length=4000, null=True
     )
-    attribute_id = models.CharField(_("Attribute ID"), max_length=4000, null=True)
+    attribute_id = models.CharField(
+        _("Attribute ID"), max_length=4000, null=True, db_index=True
+    )
 
     def __str__(self) -> str:
         return f"{self.type}-{self.attribute_id}"
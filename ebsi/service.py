@@ -37,10 +37,33 @@ class EbsiService:
 
     @staticmethod
     def revoke_accreditation(did: str, tao_attribute_id: str, revision_id: str) -> str:
+        body = EbsiService.revoke_accreditation_body(
+            did, tao_attribute_id, revision_id
+        )
+        rpc_response = RpcService(body).send_request()
+        content = rpc_response.get("content")
+        return content.get("result")
+
+    @staticmethod
+    def revoke_accreditations(params: list[tuple[str, str, str]]) -> list[dict]:
+        """
+        Revokes several accreditations, given as (did, tao_attribute_id,
+        revision_id), in JSON-RPC batches. Returns the ``result`` or
+        ``error`` of each one.
+        """
+        return RpcService.send_batch(
+            [EbsiService.revoke_accreditation_body(*item) for item in params],
+            max_workers=settings.EBSI_REVOCATION_WORKERS,
+        )
+
+    @staticmethod
+    def revoke_accreditation_body(
+        did: str, tao_attribute_id: str, revision_id: str
+    ) -> dict:
         if not tao_attribute_id.startswith("0x"):
             tao_attribute_id = "0x" + tao_attribute_id
 
-        body = {
+        return {
             "jsonrpc": "2.0",
             "method": "revokeAccreditation",
             "params": {
@@ -51,7 +74,3 @@ class EbsiService:
                 "revisionId": revision_id,
             },
         }
-
-        rpc_response = RpcService(body).send_request()
-        content = rpc_response.get("content")
-        return content.get("result")
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import hashlib
+
+from django.core.cache import cache
+from django.db import transaction
+
+from common.services.http_client import HttpClient
+from common.utils.cache_utils import get_or_fetch
+from ebsi.enums import AccreditationTypes
+from ebsi.models import EbsiAccreditationWhiteList
+from ebsi.service import EbsiService
+from project import settings
+
+
+class AccreditationWhiteListService:
+    """
+    External data of the accreditations, built from the white lists instead
+    of asking the entity.
+
+    The assembled content is cached by (type, DID), so repeated requests of
+    the same DID neither query the white list again nor reserve another
+    attribute in the Trusted Issuers Registry. It is invalidated whenever
+    the white list or its accreditation information changes. DIDs that are
+    not white listed are only cached for a short while.
+    """
+
+    @staticmethod
+    def cache_key(vc_type: str, did: str | None) -> str:
+        digest = hashlib.sha256(f"{vc_type}\n{did}".encode("utf-8")).hexdigest()
+        return f"accreditation-external-data:{digest}"
+
+    @staticmethod
+    def external_data(vc_type: str, did: str | None) -> dict | None:
+        """
+        Returns the ``body`` and ``termsOfUse`` of the accreditation, or None
+        if the DID is not white listed for it.
+        """
+        return get_or_fetch(
+            AccreditationWhiteListService.cache_key(vc_type, did),
+            lambda: AccreditationWhiteListService.build_external_data(vc_type, did),
+            settings.ACCREDITATION_EXTERNAL_DATA_CACHE_TTL,
+            sum(HttpClient.timeout()),
+            # Any caller can make up DIDs that are not white listed
+            negative_ttl=settings.ACCREDITATION_EXTERNAL_DATA_NEGATIVE_CACHE_TTL,
+        )
+
+    @staticmethod
+    def build_external_data(vc_type: str, did: str | None) -> dict | None:
+        white_list = (
+            EbsiAccreditationWhiteList.objects.filter(type=vc_type, did=did)
+            .prefetch_related("schema")
+            .first()
+        )
+        if white_list is None:
+            return None
+        accredited_for_content = []
+        terms_of_use = []
+        for information in white_list.schema.all():
+            if information.accredited_schema is not None:
+                accredited_for_content.append(
+                    {
+                        "types": information.accredited_for,
+                        "schemaId": information.accredited_schema,
+                    }
+                )
+            terms_of_use.append(information.attribute_id)
+        body = {
+            "accreditedFor": accredited_for_content,
+            # "reservedAttributeId": "WIP-ATTRIBUTE-ID" # TODO: Change after tasks related to register VCs in EBSI are done
+        }
+        if (
+            vc_type == AccreditationTypes.VerifiableAccreditationToAttest
+            or vc_type == AccreditationTypes.VerifiableAccreditationToAccredit
+        ):
+            attribute_id = EbsiService.trusted_issuer_registry(did, terms_of_use[0], vc_type)
+            body["reservedAttributeId"] = attribute_id
+        return {"body": body, "termsOfUse": terms_of_use}
+
+    @staticmethod
+    def invalidate(vc_type: str, did: str | None):
+        key = AccreditationWhiteListService.cache_key(vc_type, did)
+        transaction.on_commit(lambda: cache.delete(key))
@@ -3,6 +3,7 @@ from posixpath import join as urljoin
 
 import requests
 
+from common.services.http_client import EBSI_DIDR, EBSI_TIR, HttpClient
 from project import settings
 
 
@@ -12,7 +13,7 @@ class EbsiApiService:
     def get_did(did: str) -> dict:
         try:
             url = urljoin(settings.EBSI_DIDR_URL, did)
-            response = requests.request("GET", url)
+            response = HttpClient.request("GET", url, upstream=EBSI_DIDR)
         except Exception as e:
             raise Exception(e)
         content = json.loads(response.content.decode("utf-8"))
@@ -27,7 +28,7 @@ class EbsiApiService:
             url = urljoin(
                 settings.EBSI_TIR_URL, did, "attributes", attribute_id
             )
-            response = requests.request("GET", url)
+            response = HttpClient.request("GET", url, upstream=EBSI_TIR)
         except Exception as e:
             raise Exception(e)
         content = json.loads(response.content.decode("utf-8"))
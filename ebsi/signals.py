@@ -1,30 +1,45 @@
-import jwt
-from django.db.models.signals import post_delete, pre_delete
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
 from django.dispatch import receiver
 
 from credentials.models import VerifiableCredential
 from credentials.utils import get_first_matching_element
 from ebsi.enums import AccreditationTypes
-from ebsi.models import PotentialAccreditationInformation
+from ebsi.models import (
+    AccreditationToAccredit,
+    AccreditationToAttest,
+    AccreditationToOnboard,
+    EbsiAccreditationWhiteList,
+    PotentialAccreditationInformation,
+)
+from ebsi.services.accreditation_white_list_service import (
+    AccreditationWhiteListService,
+)
+
+# The admin edits the white lists through their proxy models
+WHITE_LIST_MODELS = [
+    EbsiAccreditationWhiteList,
+    AccreditationToAttest,
+    AccreditationToAccredit,
+    AccreditationToOnboard,
+]
 
 
 @receiver(post_delete, sender=VerifiableCredential)
 def post_delete_verifiable_credential(sender, instance: VerifiableCredential, **kwargs):
-    jwt_decoded = jwt.api_jwt.decode_complete(
-        instance.credential,
-        "",
-        algorithms=["ES256", "ES256K"],
-        options={"verify_signature": False},
+    accreditation_type = get_first_matching_element(
+        AccreditationTypes.values(), instance.types
     )
-    payload = jwt_decoded.get("payload")
-    vc = payload.get("vc")
-    types = vc.get("type")
-    accreditation_type = get_first_matching_element(AccreditationTypes.values(), types)
     if accreditation_type is None:
         return
-    credential_subject = vc.get("credentialSubject")
-    attribute_id = credential_subject.get("reservedAttributeId")
-    items = PotentialAccreditationInformation.objects.filter(attribute_id=attribute_id)
+    items = PotentialAccreditationInformation.objects.filter(
+        attribute_id=instance.reserved_attribute_id
+    )
     items.delete()
 
 
@@ -33,3 +48,46 @@ def pre_delete_potential_accreditation(sender, instance, **kwargs):
     white_lists = instance.white_lists.all()
     for list in white_lists:
         list.delete()
+
+
+def invalidate_white_list(white_list: EbsiAccreditationWhiteList):
+    AccreditationWhiteListService.invalidate(white_list.type, white_list.did)
+
+
+def pre_save_white_list(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    # The content cached for the previous type and DID is not valid anymore
+    previous = EbsiAccreditationWhiteList.objects.filter(pk=instance.pk).first()
+    if previous is not None:
+        invalidate_white_list(previous)
+
+
+def post_change_white_list(sender, instance, **kwargs):
+    invalidate_white_list(instance)
+
+
+for white_list_model in WHITE_LIST_MODELS:
+    pre_save.connect(pre_save_white_list, sender=white_list_model)
+    post_save.connect(post_change_white_list, sender=white_list_model)
+    post_delete.connect(post_change_white_list, sender=white_list_model)
+
+
+@receiver(m2m_changed, sender=EbsiAccreditationWhiteList.schema.through)
+def white_list_schema_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_white_list(instance)
+    elif action == "pre_clear":
+        for white_list in instance.white_lists.all():
+            invalidate_white_list(white_list)
+    else:
+        for white_list in EbsiAccreditationWhiteList.objects.filter(pk__in=pk_set):
+            invalidate_white_list(white_list)
+
+
+@receiver(post_save, sender=PotentialAccreditationInformation)
+def post_save_potential_accreditation(sender, instance, **kwargs):
+    for white_list in instance.white_lists.all():
+        invalidate_white_list(white_list)
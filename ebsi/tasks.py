@@ -1,8 +1,8 @@
-import jwt
 import requests
 from celery import chain, shared_task
 
 from common.services.rpc_service import RpcService
+from common.utils.jwt_utils import decode_jwt
 from ebsi.enums import EbsiDidDocumentsRelationships
 from ebsi.services.ebsi_api_service import EbsiApiService
 from project import settings
@@ -96,14 +96,7 @@ def register_verification_relationship(
 
 
 def extract_attribute_from_vc(vc: str) -> str:
-    jwt_decoded = jwt.api_jwt.decode_complete(
-        vc,
-        "",
-        algorithms=["ES256", "ES256K"],
-        options={"verify_signature": False},
-    )
-    payload = jwt_decoded.get("payload")
-    vc = payload.get("vc")
+    vc = decode_jwt(vc).vc
     credential_subject = vc.get("credentialSubject")
     attribute = credential_subject.get("reservedAttributeId")
     if attribute is None:
@@ -1,3 +1,82 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from common.tests.query_plan_test_case import QueryPlanTestCase
+from common.utils import cache_utils
+from ebsi.models import (
+    EbsiAccreditation,
+    EbsiTermsOfUse,
+    PotentialAccreditationInformation,
+)
+from ebsi.services.accreditation_white_list_service import (
+    AccreditationWhiteListService,
+)
+from project import settings
+
+
+class HotQueryPlanTests(QueryPlanTestCase):
+    def test_potential_accreditation_by_type(self):
+        self.assertUsesIndex(
+            PotentialAccreditationInformation.objects.filter(
+                type="VerifiableAccreditationToAttest"
+            )
+        )
+
+    def test_potential_accreditation_by_attribute_id(self):
+        self.assertUsesIndex(
+            PotentialAccreditationInformation.objects.filter(attribute_id="0x1234")
+        )
+
+    def test_ebsi_accreditation_by_type(self):
+        self.assertUsesIndex(
+            EbsiAccreditation.objects.filter(type="VerifiableAccreditationToAttest")
+        )
+
+    def test_terms_of_use_by_attribute_id(self):
+        self.assertUsesIndex(EbsiTermsOfUse.objects.filter(attribute_id="0x1234"))
+
+
+
+class AccreditationExternalDataCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        patcher = mock.patch.object(
+            cache_utils.time, "time", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def lookups(self, value, seconds):
+        with mock.patch.object(
+            AccreditationWhiteListService, "build_external_data", return_value=value
+        ) as build:
+            for _ in range(2):
+                AccreditationWhiteListService.external_data("type", "did:ebsi:z1")
+                self.now += seconds
+        return build.call_count
+
+    def test_not_white_listed_cached_briefly(self):
+        ttl = settings.ACCREDITATION_EXTERNAL_DATA_NEGATIVE_CACHE_TTL
+        self.assertEqual(self.lookups(None, ttl - 1), 1)
+        cache.clear()
+        self.assertEqual(self.lookups(None, ttl), 2)
+
+    def test_entries_expire(self):
+        with mock.patch.object(cache, "set", wraps=cache.set) as cache_set:
+            self.lookups(None, 0)
+            cache.clear()
+            self.lookups({"body": {}, "termsOfUse": []}, 0)
+        self.assertEqual(
+            [call.kwargs["timeout"] for call in cache_set.call_args_list],
+            [
+                settings.ACCREDITATION_EXTERNAL_DATA_NEGATIVE_CACHE_TTL,
+                settings.ACCREDITATION_EXTERNAL_DATA_CACHE_TTL + cache_utils.STALE_VALUE_TTL,
+            ],
+        )
+
+    def test_white_listed_cached_for_the_ttl(self):
+        ttl = settings.ACCREDITATION_EXTERNAL_DATA_NEGATIVE_CACHE_TTL
+        self.assertEqual(self.lookups({"body": {}, "termsOfUse": []}, ttl), 1)
@@ -1,9 +1,18 @@
 #!/bin/sh
 
-until python ./manage.py deploysetup
-do
-  echo "Retrying deploysetup command"
-  sleep 5
-done
+# One-shot setup (migrations, permissions and default users). Disable it with
+# RUN_DEPLOY_SETUP=false when a separate job runs it, e.g. with many replicas.
+if [ "${RUN_DEPLOY_SETUP:-true}" = "true" ]; then
+  until python ./manage.py deploysetup
+  do
+    echo "Retrying deploysetup command"
+    sleep 5
+  done
+fi
 
-python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+# exec, so the server receives the container signals and can stop gracefully
+if [ "${SERVER_MODE:-development}" = "production" ]; then
+  exec gunicorn project.asgi:application -c gunicorn.conf.py
+else
+  exec python manage.py runserver 0.0.0.0:8000
+fi
@@ -0,0 +1,62 @@
+"""
+Gunicorn configuration used by ``entrypoint.sh`` when SERVER_MODE is
+"production".
+
+Gunicorn is the process manager: it forks the workers, restarts the ones that
+die or are recycled, and reloads them gracefully on SIGHUP. Every worker
+serves the ASGI application with Uvicorn.
+"""
+
+import os
+import shutil
+
+
+def _available_cpus() -> int:
+    # Honours the CPUs the container is pinned to, unlike os.cpu_count()
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Worker processes, 2 * CPUs + 1 unless WEB_CONCURRENCY is set
+workers = int(os.environ.get("WEB_CONCURRENCY", 2 * _available_cpus() + 1))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Recycle each worker after this many requests (plus a random jitter, so they
+# are not all restarted at once) to bound memory growth
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+# Seconds a silent worker is given before it is killed and replaced
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+# Seconds a worker is given to finish its in-flight requests on reload/stop
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# Each worker opens its own database and HTTP connections after the fork
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+# Client addresses are taken from X-Forwarded-For of these proxies
+forwarded_allow_ips = os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+# Every worker writes its Prometheus samples here, /metrics adds them up
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus-metrics")
+
+
+def on_starting(server):
+    # Samples of a previous run must not be added up
+    multiproc_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -36,17 +36,17 @@ class AOpenidService(ABC):
 
     @staticmethod
     @abstractmethod
-    def authorize(request: object, issuer: str) -> ResponseSerializer: ...
+    async def authorize(request: object, issuer: str) -> ResponseSerializer: ...
 
     @staticmethod
     @abstractmethod
-    def direct_post(
+    async def direct_post(
         request: CreatedDirectPostSerializer, issuer_id: str
     ) -> ResponseSerializer: ...
 
     @staticmethod
     @abstractmethod
-    def token_request(
+    async def token_request(
         request: TokenRequestSerializer, issuer: str
     ) -> ResponseSerializer: ...
 
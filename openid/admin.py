@@ -14,6 +14,7 @@ from ebsi.enums import AccreditationTypes
 from ebsi.models import EbsiAccreditation
 
 # from credentials.models import EbsiAccreditation, VerifiableCredential
+from openid.service import OpenidService
 from project import settings
 
 from .models import (
@@ -87,6 +88,7 @@ class IssuanceInformationAdmin(admin.ModelAdmin):
         obj.credential_issuer_metadata["credentials_supported"] = credentials_supported
 
         super().save_model(request, obj, form, change)
+        OpenidService.invalidate_credential_issuer_metadata()
 
     # Show Pretty Metadata
     def credential_issuer_metadata_prettified(self, instance):
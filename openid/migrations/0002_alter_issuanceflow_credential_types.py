@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openid', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='issuanceflow',
+            name='credential_types',
+            field=models.CharField(db_index=True, max_length=2000, verbose_name='Credential Type'),
+        ),
+    ]
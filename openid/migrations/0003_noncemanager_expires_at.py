@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-18 09:03
+
+import openid.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openid', '0002_alter_issuanceflow_credential_types'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noncemanager',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=openid.models.default_nonce_expiry, verbose_name='Expires at'),
+        ),
+    ]
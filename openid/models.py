@@ -1,11 +1,14 @@
 import uuid
+from datetime import timedelta
 
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from openid.enums import RevocationTypes, ScopeResponseType
+from project import settings
 
 
 # Create your models here.
@@ -76,9 +79,16 @@ class PresentationDefinition(models.Model):
         return f"{self.definition_id}"
 
 
+def default_nonce_expiry():
+    return timezone.now() + timedelta(seconds=settings.NONCE_TTL)
+
+
 class NonceManager(models.Model):
     nonce = models.CharField(_("Nonce"), max_length=2000, primary_key=True)
     state = models.JSONField(_("State"), null=True, blank=True)
+    expires_at = models.DateTimeField(
+        _("Expires at"), default=default_nonce_expiry, db_index=True
+    )
 
     class Meta:
         verbose_name = "Nonce Manager"
@@ -104,7 +114,7 @@ class IssuanceFlow(models.Model):
     )
 
     credential_types = models.CharField(
-        _("Credential Type"), max_length=2000, null=False
+        _("Credential Type"), max_length=2000, null=False, db_index=True
     )
     credential_schema_address = models.CharField(
         _("Credential Schema"), max_length=2000, null=False
@@ -1,8 +1,9 @@
+from django.utils import timezone
 from rest_framework import serializers
 
 from ebsi.models import EbsiTermsOfUse
 
-from .models import IssuanceFlow, NonceManager, PresentationDefinition, VerifyFlow
+from .models import IssuanceFlow, PresentationDefinition, VerifyFlow
 
 
 class IssuanceCredentialOfferSerializer(serializers.Serializer):
@@ -161,10 +162,16 @@ class ResponseSerializer(serializers.Serializer):
     content = serializers.DictField()
 
 
-class NonceManagerSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = NonceManager
-        fields = "__all__"
+class NonceManagerSerializer(serializers.Serializer):
+    nonce = serializers.CharField(max_length=2000)
+    state = serializers.JSONField(required=False, allow_null=True)
+    expires_at = serializers.DateTimeField(required=False)
+
+    def validate_expires_at(self, value):
+        # The nonce would be stored already expired, as if it did not exist
+        if value <= timezone.now():
+            raise serializers.ValidationError("The expiry must be in the future.")
+        return value
 
 
 class IssuanceFlowSerializer(serializers.ModelSerializer):
@@ -1,18 +1,24 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import random
 import urllib.parse
 from typing import Any, List
 
 import requests
+from django.core.cache import cache
 from django.core.exceptions import BadRequest
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
 
+from common.services.entity_connector import get_entity_connector
+from common.services.http_client import AsyncHttpClient, HttpClient
+from common.utils.cache_utils import get_or_fetch
 from common.utils.credential_offer_utils import (
     check_requested_types_for_credential_offer,
     generate_credential_offer,
 )
-from common.utils.crypto_utils import calculate_jwk_thumbprint
 from ebsi.enums import AccreditationTypes
 from ebsi.models import EbsiAccreditation
 from openid.enums import RevocationTypes
@@ -35,6 +41,10 @@ from .serializers import (
     VerifyFlowSerializer,
 )
 
+ISSUER_METADATA_CACHE_KEY = "openid:credential-issuer-metadata"
+AUTHORIZATION_SERVER_METADATA_CACHE_KEY = "openid:authorization-server-metadata"
+JWKS_CACHE_KEY = "openid:jwks"
+
 
 class OpenidService(AOpenidService):
     @staticmethod
@@ -118,15 +128,60 @@ class OpenidService(AOpenidService):
 
         return metadata.credential_issuer_metadata
 
+    @staticmethod
+    def get_credential_issuer_metadata_document() -> dict | None:
+        """
+        Returns the rendered credential issuer metadata as
+        ``{"content": bytes, "etag": str}``, or None if it is not configured.
+        The document is kept in the shared cache until the issuance
+        information changes.
+        """
+        document = cache.get(ISSUER_METADATA_CACHE_KEY)
+        if document is None:
+            metadata = IssuanceInformation.objects.filter().first()
+            document = {"content": None, "etag": None}
+            if metadata is not None and metadata.credential_issuer_metadata:
+                content = JSONRenderer().render(
+                    CredentialIssuerSerializer(
+                        metadata.credential_issuer_metadata
+                    ).data
+                )
+                document = {
+                    "content": content,
+                    "etag": '"' + hashlib.sha256(content).hexdigest()[:32] + '"',
+                }
+            cache.set(
+                ISSUER_METADATA_CACHE_KEY, document, settings.ISSUER_METADATA_CACHE_TTL
+            )
+        if document["content"] is None:
+            return None
+        return document
+
+    @staticmethod
+    def invalidate_credential_issuer_metadata():
+        # Deleted after commit, otherwise a concurrent request could cache
+        # the previous metadata again before the change is visible
+        transaction.on_commit(lambda: cache.delete(ISSUER_METADATA_CACHE_KEY))
+
     @staticmethod
     def get_authorization_server_metadata() -> AuthorizationServerSerializer | None:
+        # Only changes when the VC Service is redeployed
+        return get_or_fetch(
+            AUTHORIZATION_SERVER_METADATA_CACHE_KEY,
+            OpenidService._fetch_authorization_server_metadata,
+            settings.AUTHORIZATION_SERVER_METADATA_CACHE_TTL,
+            sum(HttpClient.timeout()),
+        )
+
+    @staticmethod
+    def _fetch_authorization_server_metadata() -> AuthorizationServerSerializer:
         url = f"{settings.VC_SERVICE_URL}/auth/.well-known/openid-configuration"
         params = {
             "issuerUri": f"{settings.BACKEND_DOMAIN}",
         }
 
         try:
-            response = requests.request("GET", url, params=params)
+            response = HttpClient.request("GET", url, params=params)
         except Exception as e:
             raise Exception(e)
 
@@ -147,7 +202,7 @@ class OpenidService(AOpenidService):
         return result
 
     @staticmethod
-    def authorize(request: Any) -> ResponseSerializer | None:
+    async def authorize(request: Any) -> ResponseSerializer | None:
         url = f"{settings.VC_SERVICE_URL}/auth/authorize"
         request_get = request.GET
 
@@ -174,7 +229,7 @@ class OpenidService(AOpenidService):
         params["issuerUri"] = f"{settings.BACKEND_DOMAIN}"
 
         try:
-            response = requests.request("GET", url, params=params)
+            response = await AsyncHttpClient.request("GET", url, params=params)
         except Exception as e:
             raise Exception(e)
 
@@ -184,7 +239,7 @@ class OpenidService(AOpenidService):
         return return_dict
 
     @staticmethod
-    def direct_post(
+    async def direct_post(
         request: CreatedDirectPostSerializer,
     ) -> ResponseSerializer:
         url = f"{settings.VC_SERVICE_URL}/auth/direct_post"
@@ -197,7 +252,7 @@ class OpenidService(AOpenidService):
         }
 
         try:
-            response = requests.request(
+            response = await AsyncHttpClient.request(
                 "POST",
                 url,
                 headers=headers,
@@ -213,7 +268,7 @@ class OpenidService(AOpenidService):
         return return_dict
 
     @staticmethod
-    def token_request(request: Any) -> ResponseSerializer:
+    async def token_request(request: Any) -> ResponseSerializer:
         url = f"{settings.VC_SERVICE_URL}/auth/token"
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
@@ -230,7 +285,7 @@ class OpenidService(AOpenidService):
         }
 
         try:
-            response = requests.request(
+            response = await AsyncHttpClient.request(
                 "POST",
                 url,
                 headers=headers,
@@ -246,36 +301,46 @@ class OpenidService(AOpenidService):
 
     @staticmethod
     def get_public_jwk_by_issuer() -> dict | None:
-        keys = OrganizationKeys.objects.values_list("value", flat=True)
-        for key in keys:
-            thumprint = calculate_jwk_thumbprint(key)
-            key["kid"] = thumprint
+        keys = []
+        for value, thumbprint in OrganizationKeys.objects.order_by("pk").values_list(
+            "value", "thumbprint"
+        ):
+            if thumbprint is not None:
+                value["kid"] = thumbprint
+            keys.append(value)
         return {"keys": keys}
 
     @staticmethod
-    def get_claims_validation(data: Any) -> ClaimsVerificationSerializer:
-        entity_url = settings.ENTITY_URL
-        entity_api_key = settings.ENTITY_API_KEY
+    def get_public_jwk_document() -> dict:
+        """
+        Returns the rendered JWKS as ``{"content": bytes, "etag": str}``.
+        It is rebuilt when the organization keys change.
+        """
+        document = cache.get(JWKS_CACHE_KEY)
+        if document is None:
+            document = OpenidService.build_public_jwk_document()
+        return document
 
-        if not entity_url and settings.DEVELOPER_MOCKUP_ENTITIES:
-            # Return empty data
-            content = {"verified": True}
-        else:
-            headers = {}
-            if entity_api_key:
-                headers = {"X-API-KEY": entity_api_key}
-            try:
-                response = requests.request(
-                    "POST",
-                    entity_url + "/presentations/external-data",
-                    headers=headers,
-                    json=data,
-                )
-                content = json.loads(response.content.decode("utf-8"))
-            except Exception as e:
-                raise Exception(e)
+    @staticmethod
+    def build_public_jwk_document() -> dict:
+        content = JSONRenderer().render(OpenidService.get_public_jwk_by_issuer())
+        document = {
+            "content": content,
+            "etag": '"' + hashlib.sha256(content).hexdigest()[:32] + '"',
+        }
+        cache.set(JWKS_CACHE_KEY, document, timeout=None)
+        return document
 
-        return content
+    @staticmethod
+    def refresh_public_jwk_document():
+        transaction.on_commit(OpenidService.build_public_jwk_document)
+
+    @staticmethod
+    def get_claims_validation(data: Any) -> ClaimsVerificationSerializer:
+        try:
+            return get_entity_connector().validate_claims(data)
+        except Exception as e:
+            raise Exception(e)
 
     @staticmethod
     def retrieve_issuance_flow(vc_type: str) -> dict | None:
@@ -307,11 +372,15 @@ class OpenidService(AOpenidService):
         return {"status_code": 200, "content": model_response}
 
     @staticmethod
-    def create_presentation_offer(
+    async def create_presentation_offer(
         id: str,
         state: str | None,
     ) -> dict | PresentationOfferJsonResponse | None:
-        offer = VerifyFlow.objects.filter(id=id).first()
+        offer = (
+            await VerifyFlow.objects.select_related("presentation_definition")
+            .filter(id=id)
+            .afirst()
+        )
 
         url = f"{settings.VC_SERVICE_URL}/auth/presentation-offer"
 
@@ -323,7 +392,7 @@ class OpenidService(AOpenidService):
             payload["state"] = state
 
         try:
-            response = requests.request("POST", url, json=payload)
+            response = await AsyncHttpClient.request("POST", url, json=payload)
         except Exception as e:
             raise Exception(e)
 
@@ -1,14 +1,128 @@
+import io
+from decimal import Decimal
+from functools import lru_cache
+
 import qrcode
+import qrcode.image.svg
 from PIL import Image, ImageDraw
 
+from project import settings
+
+QR_FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+QR_ERROR_CORRECTIONS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+QR_MAX_BORDER = 10
+
+
+class SvgPixelPathImage(qrcode.image.svg.SvgPathImage):
+    """
+    SVG path image whose ``box_size`` is in pixels, as for PNG, instead of
+    qrcode's tenths of a millimetre.
+    """
+
+    def units(self, pixels, text=True):
+        units = Decimal(pixels)
+        return f"{units}px" if text else units
+
 
 class GenerateQr:
-    def __init__(self, url):
+    def __init__(
+        self,
+        url,
+        format: str = "png",
+        box_size: int | None = None,
+        border: int | None = None,
+        error_correction: str | None = None,
+    ):
         self.credential_offer: str = url
+        self.format = format
+        # Pixels per module, in both PNG and SVG
+        self.box_size = settings.QR_BOX_SIZE if box_size is None else box_size
+        self.border = settings.QR_BORDER if border is None else border
+        self.error_correction = error_correction or settings.QR_ERROR_CORRECTION
 
-    def generate_qr(self) -> str:
-        qr_image = qrcode.QRCode(version=1, box_size=8, border=5)
-        qr_image.add_data(self.credential_offer)
-        qr_image.make(fit=True)
+    @staticmethod
+    def from_query(url, query) -> "GenerateQr":
+        """
+        Builds the generator from the ``format``, ``box_size``, ``border`` and
+        ``error_correction`` query parameters. Raises ValueError if any of
+        them is not valid.
+        """
+        format = query.get("format", "png").lower()
+        if format not in QR_FORMATS:
+            raise ValueError("format must be one of: " + ", ".join(QR_FORMATS))
+        error_correction = query.get("error_correction")
+        if error_correction is not None:
+            error_correction = error_correction.upper()
+            if error_correction not in QR_ERROR_CORRECTIONS:
+                raise ValueError(
+                    "error_correction must be one of: "
+                    + ", ".join(QR_ERROR_CORRECTIONS)
+                )
+        box_size = GenerateQr._int_param(
+            query, "box_size", 1, settings.QR_MAX_BOX_SIZE
+        )
+        border = GenerateQr._int_param(query, "border", 0, QR_MAX_BORDER)
+        return GenerateQr(url, format, box_size, border, error_correction)
+
+    @staticmethod
+    def _int_param(query, name: str, minimum: int, maximum: int) -> int | None:
+        value = query.get(name)
+        if value is None:
+            return None
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValueError(f"{name} must be an integer")
+        if not minimum <= value <= maximum:
+            raise ValueError(f"{name} must be between {minimum} and {maximum}")
+        return value
+
+    @property
+    def content_type(self) -> str:
+        return QR_FORMATS[self.format]
+
+    def generate_qr(self) -> Image:
+        qr_image = self._build_qr()
         qr_offset = qr_image.make_image(fill_color="black", back_color="white")
         return qr_offset
+
+    def render(self) -> bytes:
+        """Returns the encoded image, reusing recent renders of the same QR."""
+        return _render(
+            self.credential_offer,
+            self.format,
+            self.box_size,
+            self.border,
+            self.error_correction,
+        )
+
+    def _build_qr(self, image_factory=None) -> qrcode.QRCode:
+        qr_image = qrcode.QRCode(
+            version=1,
+            box_size=self.box_size,
+            border=self.border,
+            error_correction=QR_ERROR_CORRECTIONS[self.error_correction],
+            image_factory=image_factory,
+        )
+        qr_image.add_data(self.credential_offer)
+        qr_image.make(fit=True)
+        return qr_image
+
+
+@lru_cache(maxsize=settings.QR_RENDER_CACHE_SIZE)
+def _render(
+    data: str, format: str, box_size: int, border: int, error_correction: str
+) -> bytes:
+    generator = GenerateQr(data, format, box_size, border, error_correction)
+    buffer = io.BytesIO()
+    if format == "svg":
+        # Pure XML output, Pillow is not involved
+        generator._build_qr(SvgPixelPathImage).make_image().save(buffer)
+    else:
+        generator.generate_qr().save(buffer, "PNG")
+    return buffer.getvalue()
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import json
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+
+import redis
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from openid.models import NonceManager
+from project import settings
+
+DATABASE = "database"
+REDIS = "redis"
+
+
+class NonceStore(ABC):
+    """
+    Storage of the nonces shared with the VC Service.
+
+    A nonce is a dict with ``nonce``, ``state`` and ``expires_at``. Expired
+    nonces are never returned.
+    """
+
+    @abstractmethod
+    def list(self) -> list[dict]: ...
+
+    @abstractmethod
+    def get(self, nonce: str) -> dict | None: ...
+
+    @abstractmethod
+    def create(self, nonce: str, state, expires_at: datetime | None = None) -> dict | None:
+        """
+        Stores a new nonce. Returns None if it already exists. ``expires_at``
+        must be in the future.
+        """
+
+    @abstractmethod
+    def update(self, nonce: str, values: dict) -> dict | None:
+        """Updates ``state`` and/or ``expires_at``. Returns None if missing."""
+
+    @abstractmethod
+    def delete(self, nonce: str) -> bool: ...
+
+    @abstractmethod
+    def consume(self, nonce: str) -> dict | None:
+        """Atomically returns and deletes a nonce, so it can only be used once."""
+
+    @staticmethod
+    def default_expiry() -> datetime:
+        return timezone.now() + timedelta(seconds=settings.NONCE_TTL)
+
+    @staticmethod
+    def expiry(expires_at: datetime | None) -> datetime:
+        """Returns the expiry of a new nonce, NONCE_TTL from now by default."""
+        if expires_at is None:
+            return NonceStore.default_expiry()
+        if expires_at <= timezone.now():
+            raise ValueError("The expiry of a nonce must be in the future")
+        return expires_at
+
+
+class DatabaseNonceStore(NonceStore):
+    @staticmethod
+    def _valid():
+        return NonceManager.objects.filter(expires_at__gt=timezone.now())
+
+    @staticmethod
+    def _to_dict(instance: NonceManager) -> dict:
+        return {
+            "nonce": instance.nonce,
+            "state": instance.state,
+            "expires_at": instance.expires_at,
+        }
+
+    def list(self) -> list[dict]:
+        return [self._to_dict(instance) for instance in self._valid()]
+
+    def get(self, nonce: str) -> dict | None:
+        instance = self._valid().filter(nonce=nonce).first()
+        return self._to_dict(instance) if instance else None
+
+    def create(self, nonce: str, state, expires_at: datetime | None = None) -> dict | None:
+        expires_at = self.expiry(expires_at)
+        # An expired nonce that was not purged yet can be reused
+        NonceManager.objects.filter(nonce=nonce, expires_at__lte=timezone.now()).delete()
+        try:
+            with transaction.atomic():
+                instance = NonceManager.objects.create(
+                    nonce=nonce,
+                    state=state,
+                    expires_at=expires_at,
+                )
+        except IntegrityError:
+            return None
+        return self._to_dict(instance)
+
+    def update(self, nonce: str, values: dict) -> dict | None:
+        with transaction.atomic():
+            instance = self._valid().select_for_update().filter(nonce=nonce).first()
+            if instance is None:
+                return None
+            for field in ("state", "expires_at"):
+                if field in values:
+                    setattr(instance, field, values[field])
+            instance.save()
+        return self._to_dict(instance)
+
+    def delete(self, nonce: str) -> bool:
+        deleted, _ = self._valid().filter(nonce=nonce).delete()
+        return deleted > 0
+
+    def consume(self, nonce: str) -> dict | None:
+        with transaction.atomic():
+            instance = self._valid().select_for_update().filter(nonce=nonce).first()
+            if instance is None:
+                return None
+            NonceManager.objects.filter(nonce=nonce).delete()
+        return self._to_dict(instance)
+
+
+class RedisNonceStore(NonceStore):
+    """
+    Keeps each nonce in its own key, expired by Redis itself, and indexes
+    them in a sorted set scored by expiry, so listing them reads the index
+    instead of scanning the keyspace.
+    """
+
+    KEY_PREFIX = "nonce:"
+    INDEX_KEY = "nonce-index"
+
+    def __init__(self, url: str):
+        self.client = redis.Redis.from_url(url)
+
+    def _key(self, nonce: str) -> str:
+        return self.KEY_PREFIX + nonce
+
+    @staticmethod
+    def _expiry_ms(expires_at: datetime) -> int:
+        return max(int(expires_at.timestamp() * 1000), 1)
+
+    @staticmethod
+    def _dump(nonce: str, state, expires_at: datetime) -> str:
+        return json.dumps({"nonce": nonce, "state": state, "expires_at": expires_at.isoformat()})
+
+    @staticmethod
+    def _load(value) -> dict | None:
+        if value is None:
+            return None
+        data = json.loads(value)
+        data["expires_at"] = datetime.fromisoformat(data["expires_at"])
+        return data
+
+    def _prune_index(self, pipe) -> None:
+        now_ms = int(timezone.now().timestamp() * 1000)
+        pipe.zremrangebyscore(self.INDEX_KEY, "-inf", now_ms)
+
+    def list(self) -> list[dict]:
+        with self.client.pipeline() as pipe:
+            self._prune_index(pipe)
+            pipe.zrange(self.INDEX_KEY, 0, -1)
+            _, members = pipe.execute()
+        if not members:
+            return []
+        nonces = []
+        missing = []
+        values = self.client.mget([self._key(m.decode()) for m in members])
+        for member, value in zip(members, values):
+            data = self._load(value)
+            if data is None:
+                missing.append(member)
+            else:
+                nonces.append(data)
+        if missing:
+            self.client.zrem(self.INDEX_KEY, *missing)
+        return nonces
+
+    def get(self, nonce: str) -> dict | None:
+        return self._load(self.client.get(self._key(nonce)))
+
+    def create(self, nonce: str, state, expires_at: datetime | None = None) -> dict | None:
+        expires_at = self.expiry(expires_at)
+        created = self.client.set(
+            self._key(nonce),
+            self._dump(nonce, state, expires_at),
+            nx=True,
+            pxat=self._expiry_ms(expires_at),
+        )
+        if not created:
+            return None
+        with self.client.pipeline() as pipe:
+            pipe.zadd(self.INDEX_KEY, {nonce: self._expiry_ms(expires_at)})
+            self._prune_index(pipe)
+            pipe.execute()
+        return {"nonce": nonce, "state": state, "expires_at": expires_at}
+
+    def update(self, nonce: str, values: dict) -> dict | None:
+        key = self._key(nonce)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    data = self._load(pipe.get(key))
+                    if data is None:
+                        pipe.reset()
+                        return None
+                    for field in ("state", "expires_at"):
+                        if field in values:
+                            data[field] = values[field]
+                    expiry_ms = self._expiry_ms(data["expires_at"])
+                    pipe.multi()
+                    pipe.set(
+                        key,
+                        self._dump(nonce, data["state"], data["expires_at"]),
+                        pxat=expiry_ms,
+                    )
+                    pipe.zadd(self.INDEX_KEY, {nonce: expiry_ms})
+                    pipe.execute()
+                    return data
+                except redis.WatchError:
+                    continue
+
+    def delete(self, nonce: str) -> bool:
+        with self.client.pipeline() as pipe:
+            pipe.delete(self._key(nonce))
+            pipe.zrem(self.INDEX_KEY, nonce)
+            deleted, _ = pipe.execute()
+        return deleted > 0
+
+    def consume(self, nonce: str) -> dict | None:
+        with self.client.pipeline() as pipe:
+            pipe.getdel(self._key(nonce))
+            pipe.zrem(self.INDEX_KEY, nonce)
+            value, _ = pipe.execute()
+        return self._load(value)
+
+
+_store: NonceStore = None
+_store_lock = threading.Lock()
+
+
+def get_nonce_store() -> NonceStore:
+    """Returns the store selected by the ``NONCE_STORE`` setting."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if settings.NONCE_STORE == REDIS:
+                    _store = RedisNonceStore(settings.NONCE_REDIS_URL)
+                elif settings.NONCE_STORE == DATABASE:
+                    _store = DatabaseNonceStore()
+                else:
+                    raise ValueError(
+                        f"Unknown NONCE_STORE {settings.NONCE_STORE!r}, "
+                        f"expected {DATABASE!r} or {REDIS!r}"
+                    )
+    return _store
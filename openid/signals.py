@@ -4,6 +4,8 @@ from django.dispatch import receiver
 from ebsi.enums import AccreditationTypes
 from ebsi.models import EbsiAccreditation
 from openid.models import IssuanceFlow, IssuanceInformation
+from openid.service import OpenidService
+from organizations.models import OrganizationKeys
 
 
 def update_credential_supported():
@@ -60,3 +62,23 @@ def post_delete_issuance_flow(sender, instance: IssuanceFlow, **kwargs):
 @receiver(post_delete, sender=EbsiAccreditation)
 def post_delete_ebsi_accreditation(sender, instance: EbsiAccreditation, **kwargs):
     update_credential_supported()
+
+
+@receiver(post_save, sender=IssuanceInformation)
+def post_save_issuance_information(sender, instance: IssuanceInformation, **kwargs):
+    OpenidService.invalidate_credential_issuer_metadata()
+
+
+@receiver(post_delete, sender=IssuanceInformation)
+def post_delete_issuance_information(sender, instance: IssuanceInformation, **kwargs):
+    OpenidService.invalidate_credential_issuer_metadata()
+
+
+@receiver(post_save, sender=OrganizationKeys)
+def post_save_organization_keys(sender, instance: OrganizationKeys, **kwargs):
+    OpenidService.refresh_public_jwk_document()
+
+
+@receiver(post_delete, sender=OrganizationKeys)
+def post_delete_organization_keys(sender, instance: OrganizationKeys, **kwargs):
+    OpenidService.refresh_public_jwk_document()
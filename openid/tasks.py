@@ -0,0 +1,22 @@
+from celery import shared_task
+from django.utils import timezone
+
+from openid.models import NonceManager
+from project import settings
+
+
+@shared_task()
+def purge_expired_nonces() -> int:
+    """Deletes expired nonces in batches, so no single query locks many rows."""
+    purged = 0
+    now = timezone.now()
+    while True:
+        nonces = list(
+            NonceManager.objects.filter(expires_at__lte=now).values_list("nonce", flat=True)[
+                : settings.NONCE_PURGE_BATCH_SIZE
+            ]
+        )
+        if not nonces:
+            return purged
+        deleted, _ = NonceManager.objects.filter(nonce__in=nonces, expires_at__lte=now).delete()
+        purged += deleted
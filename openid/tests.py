@@ -1,3 +1,91 @@
+import io
+import re
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from common.tests.query_plan_test_case import QueryPlanTestCase
+from openid.models import IssuanceFlow
+from openid.services.generateqr import GenerateQr
+from openid.services.nonce_store import DatabaseNonceStore, NonceStore
+
+
+class HotQueryPlanTests(QueryPlanTestCase):
+    def test_issuance_flow_by_credential_type(self):
+        self.assertUsesIndex(
+            IssuanceFlow.objects.filter(credential_types="VerifiableId")
+        )
+
+
+class NonceManagerTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create(username="issuer")
+        )
+        DatabaseNonceStore().create("abc", {"step": 1})
+
+    def test_put_requires_every_field(self):
+        response = self.client.put(
+            "/nonce-manager/abc", {"state": {"step": 2}}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("nonce", response.json())
+
+    def test_put(self):
+        response = self.client.put(
+            "/nonce-manager/abc", {"nonce": "abc", "state": {"step": 2}}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(DatabaseNonceStore().get("abc")["state"], {"step": 2})
+
+    def test_put_cannot_rename(self):
+        response = self.client.put(
+            "/nonce-manager/abc", {"nonce": "xyz", "state": None}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNotNone(DatabaseNonceStore().get("abc"))
+
+    def test_patch(self):
+        response = self.client.patch(
+            "/nonce-manager/abc", {"state": {"step": 3}}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["nonce"], "abc")
+
+    def test_create_already_expired(self):
+        response = self.client.post(
+            "/nonce-manager",
+            {"nonce": "old", "expires_at": timezone.now() - timedelta(seconds=1)},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("expires_at", response.json())
+        with self.assertRaises(ValueError):
+            DatabaseNonceStore().create("old", None, timezone.now())
+
+    def test_incomplete_store_cannot_be_created(self):
+        class NoConsumeStore(DatabaseNonceStore):
+            consume = NonceStore.consume
+
+        with self.assertRaises(TypeError):
+            NoConsumeStore()
+
+    def test_consume_once(self):
+        first = self.client.post("/nonce-manager/abc/consume")
+        second = self.client.post("/nonce-manager/abc/consume")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 404)
+
 
-# Create your tests here.
+class GenerateQrTests(TestCase):
+    def test_svg_and_png_have_the_same_size(self):
+        url = "openid-credential-offer://?credential_offer_uri=https://example.org"
+        png = Image.open(io.BytesIO(GenerateQr(url, "png", 8, 5).render()))
+        svg = GenerateQr(url, "svg", 8, 5).render().decode()
+        width = re.search(r'width="([0-9.]+)px"', svg).group(1)
+        self.assertEqual(int(width), png.width)
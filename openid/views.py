@@ -1,9 +1,10 @@
+from adrf.viewsets import ViewSet as AsyncViewSet
 from django.http import HttpResponse
 from django.http.response import HttpResponseBadRequest, HttpResponseNotFound
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from PIL import Image
 from rest_framework import status
 from rest_framework.authentication import BasicAuthentication, SessionAuthentication
 from rest_framework.decorators import action
@@ -11,11 +12,13 @@ from rest_framework.mixins import RetrieveModelMixin
 from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.viewsets import GenericViewSet, ModelViewSet, ViewSet
+from rest_framework.viewsets import GenericViewSet, ViewSet
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from openid.models import NonceManager, PresentationDefinition, VerifyFlow
+from openid.models import PresentationDefinition, VerifyFlow
 from openid.services.generateqr import GenerateQr
+from openid.services.nonce_store import get_nonce_store
+from project import settings
 
 from .serializers import (
     AuthorizationServerSerializer,
@@ -39,7 +42,7 @@ from .serializers import (
 from .service import OpenidService
 
 
-class OpenidView(ViewSet):
+class OpenidView(AsyncViewSet):
     permission_classes = (AllowAny,)
     parser_classes = [JSONParser, FormParser, MultiPartParser]
 
@@ -112,6 +115,34 @@ class OpenidView(ViewSet):
                 items=openapi.Items(type=openapi.TYPE_STRING),
                 collectionFormat="multi",
             ),
+            openapi.Parameter(
+                "format",
+                openapi.IN_QUERY,
+                description="Image format: png (default) or svg",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "box_size",
+                openapi.IN_QUERY,
+                description="Pixels per QR module",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+            ),
+            openapi.Parameter(
+                "border",
+                openapi.IN_QUERY,
+                description="Quiet zone width in modules",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+            ),
+            openapi.Parameter(
+                "error_correction",
+                openapi.IN_QUERY,
+                description="Error correction level: L, M, Q or H",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
         ],
         operation_description="GET Credential Offer QR",
         responses={200: openapi.Response("", QrSerializer)},
@@ -125,9 +156,11 @@ class OpenidView(ViewSet):
         )
         if credential_offer:
             url = IssuanceOfferResponse(credential_offer).data
-            qr: Image = GenerateQr(url["credential_offer"]).generate_qr()
-            response = HttpResponse(content_type="image/png")
-            qr.save(response, "PNG")
+            try:
+                qr = GenerateQr.from_query(url["credential_offer"], request.GET)
+            except ValueError as e:
+                return HttpResponseBadRequest(str(e))
+            response = HttpResponse(qr.render(), content_type=qr.content_type)
             response.headers["Pin"] = url.get("pin")
             return response
 
@@ -193,13 +226,17 @@ class OpenidView(ViewSet):
         url_path=".well-known/openid-credential-issuer",
     )
     def get_credential_issuer_metadata_by_issuer(self, request):
-        credential_issuer_metadata = (
-            OpenidService.get_credential_issuer_metadata_by_issuer()
-        )
-        if credential_issuer_metadata:
-            return Response(CredentialIssuerSerializer(credential_issuer_metadata).data)
-
-        return HttpResponseNotFound("Credential Issuer metadata not found.")
+        document = OpenidService.get_credential_issuer_metadata_document()
+        if document is None:
+            return HttpResponseNotFound("Credential Issuer metadata not found.")
+
+        response = get_conditional_response(request, etag=document["etag"])
+        if response is None:
+            response = HttpResponse(
+                document["content"], content_type="application/json"
+            )
+        response["ETag"] = document["etag"]
+        return response
 
     @swagger_auto_schema(
         method="get",
@@ -324,8 +361,8 @@ class OpenidView(ViewSet):
         responses={302: openapi.Response("", AuthorizeResponseSerializer)},
     )
     @action(detail=False, methods=["get"], url_path="auth/authorize")
-    def authorize(self, request):
-        authorize = OpenidService.authorize(request)
+    async def authorize(self, request):
+        authorize = await OpenidService.authorize(request)
         code = authorize.get("status_code")
         content = authorize.get("content")
         if code == 302 or code == 200:
@@ -349,7 +386,7 @@ class OpenidView(ViewSet):
         responses={302: openapi.Response("", AuthorizeResponseSerializer)},
     )
     @action(detail=False, methods=["post"], url_path="auth/direct_post")
-    def direct_post(self, request):
+    async def direct_post(self, request):
         request_data = request.data
 
         vp_token_present = request_data.get("vp_token") is not None
@@ -369,7 +406,7 @@ class OpenidView(ViewSet):
         elif presentation_submission_required:
             return HttpResponseBadRequest("presentation_submission is required.")
 
-        direct_post = OpenidService.direct_post(request_data)
+        direct_post = await OpenidService.direct_post(request_data)
         code = direct_post.get("status_code")
         content = direct_post.get("content")
         if code == 302:
@@ -397,7 +434,7 @@ class OpenidView(ViewSet):
         responses={200: openapi.Response("", TokenResponseSerializer)},
     )
     @action(detail=False, methods=["post"], url_path="auth/token")
-    def token_request(self, request):
+    async def token_request(self, request):
         request_data = request.data
         if request_data.get("grant_type") is None:
             return HttpResponseBadRequest("Grant_type is required.")
@@ -412,7 +449,7 @@ class OpenidView(ViewSet):
                 return HttpResponseBadRequest("Pre-authorized_code is required.")
         else:
             return HttpResponseBadRequest("Grant_type error.")
-        token = OpenidService.token_request(request_data)
+        token = await OpenidService.token_request(request_data)
         code = token.get("status_code")
         content = token.get("content")
         if code == 200:
@@ -434,11 +471,17 @@ class OpenidView(ViewSet):
     )
     @action(detail=False, methods=["get"], url_path="auth/jwks")
     def get_public_jwk(self, request):
-        public_jwk = OpenidService.get_public_jwk_by_issuer()
-        if public_jwk:
-            return Response((public_jwk))
-
-        return HttpResponseBadRequest("Public jwk not found.")
+        document = OpenidService.get_public_jwk_document()
+        response = get_conditional_response(request, etag=document["etag"])
+        if response is None:
+            response = HttpResponse(
+                document["content"], content_type="application/json"
+            )
+        response["ETag"] = document["etag"]
+        patch_cache_control(
+            response, public=True, max_age=settings.JWKS_CACHE_MAX_AGE
+        )
+        return response
 
     @swagger_auto_schema(
         method="post",
@@ -509,6 +552,34 @@ class OpenidView(ViewSet):
                 type=openapi.TYPE_STRING,
                 required=False,
             ),
+            openapi.Parameter(
+                "format",
+                openapi.IN_QUERY,
+                description="Image format: png (default) or svg",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "box_size",
+                openapi.IN_QUERY,
+                description="Pixels per QR module",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+            ),
+            openapi.Parameter(
+                "border",
+                openapi.IN_QUERY,
+                description="Quiet zone width in modules",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+            ),
+            openapi.Parameter(
+                "error_correction",
+                openapi.IN_QUERY,
+                description="Error correction level: L, M, Q or H",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
         ],
         operation_description="GET Presentation Offer QR",
         responses={200: openapi.Response("", QrSerializer)},
@@ -521,10 +592,11 @@ class OpenidView(ViewSet):
         )
         if presentation_offer:
             url = PresentationResponse(presentation_offer).data
-            qr: Image = GenerateQr(url["presentation_offer"]).generate_qr()
-            response = HttpResponse(content_type="image/png")
-            qr.save(response, "PNG")
-            return response
+            try:
+                qr = GenerateQr.from_query(url["presentation_offer"], request.GET)
+            except ValueError as e:
+                return HttpResponseBadRequest(str(e))
+            return HttpResponse(qr.render(), content_type=qr.content_type)
         return HttpResponseBadRequest("Presentation Offer not found.")
 
     @swagger_auto_schema(
@@ -548,8 +620,8 @@ class OpenidView(ViewSet):
         responses={200: openapi.Response("", PresentationOfferJsonResponse)},
     )
     @action(detail=True, methods=["get"], url_path="presentation-offer")
-    def get_presentation_offer(self, request, pk: str):
-        presentation_offer = OpenidService.create_presentation_offer(
+    async def get_presentation_offer(self, request, pk: str):
+        presentation_offer = await OpenidService.create_presentation_offer(
             pk,
             request.GET.get("state"),
         )
@@ -579,16 +651,94 @@ class PresentationDefinitionView(RetrieveModelMixin, GenericViewSet):
         return Response(serializer.data)
 
 
-class NonceManagerView(ModelViewSet):
+class NonceManagerView(ViewSet):
+    """
+    CRUD over the nonce store selected by ``NONCE_STORE``. Expired nonces
+    behave as if they did not exist.
+    """
+
     permission_classes = (IsAuthenticated,)
     authentication_classes = [
         SessionAuthentication,
         BasicAuthentication,
         JWTAuthentication,
     ]
-    model_class = NonceManager
-    queryset = NonceManager.objects.all()
-    serializer_class = NonceManagerSerializer
+
+    @swagger_auto_schema(responses={200: NonceManagerSerializer(many=True)})
+    def list(self, request):
+        return Response(
+            NonceManagerSerializer(get_nonce_store().list(), many=True).data
+        )
+
+    @swagger_auto_schema(
+        request_body=NonceManagerSerializer,
+        responses={201: NonceManagerSerializer},
+    )
+    def create(self, request):
+        serializer = NonceManagerSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        nonce = get_nonce_store().create(
+            data["nonce"], data.get("state"), data.get("expires_at")
+        )
+        if nonce is None:
+            return Response(
+                {"nonce": ["nonce manager with this nonce already exists."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            NonceManagerSerializer(nonce).data, status=status.HTTP_201_CREATED
+        )
+
+    @swagger_auto_schema(responses={200: NonceManagerSerializer})
+    def retrieve(self, request, pk=None):
+        nonce = get_nonce_store().get(pk)
+        if nonce is None:
+            return HttpResponseNotFound("Nonce not found.")
+        return Response(NonceManagerSerializer(nonce).data)
+
+    @swagger_auto_schema(
+        request_body=NonceManagerSerializer,
+        responses={200: NonceManagerSerializer},
+    )
+    def update(self, request, pk=None, partial=False):
+        serializer = NonceManagerSerializer(data=request.data, partial=partial)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if serializer.validated_data.get("nonce", pk) != pk:
+            return Response(
+                {"nonce": ["The nonce can't be changed."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        nonce = get_nonce_store().update(pk, serializer.validated_data)
+        if nonce is None:
+            return HttpResponseNotFound("Nonce not found.")
+        return Response(NonceManagerSerializer(nonce).data)
+
+    @swagger_auto_schema(
+        request_body=NonceManagerSerializer,
+        responses={200: NonceManagerSerializer},
+    )
+    def partial_update(self, request, pk=None):
+        return self.update(request, pk, partial=True)
+
+    def destroy(self, request, pk=None):
+        if not get_nonce_store().delete(pk):
+            return HttpResponseNotFound("Nonce not found.")
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @swagger_auto_schema(
+        method="post",
+        operation_description="Get and delete a nonce in one atomic step",
+        responses={200: NonceManagerSerializer},
+    )
+    @action(detail=True, methods=["post"])
+    def consume(self, request, pk=None):
+        nonce = get_nonce_store().consume(pk)
+        if nonce is None:
+            return HttpResponseNotFound("Nonce not found.")
+        return Response(NonceManagerSerializer(nonce).data)
 
 
 class ScopeActionView(ViewSet):
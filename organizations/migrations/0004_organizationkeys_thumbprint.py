@@ -0,0 +1,31 @@
+# Generated by Django 5.1 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+from common.utils.crypto_utils import calculate_jwk_thumbprint
+
+
+def fill_thumbprints(apps, schema_editor):
+    OrganizationKeys = apps.get_model("organizations", "OrganizationKeys")
+    for key in OrganizationKeys.objects.all():
+        try:
+            thumbprint = calculate_jwk_thumbprint(key.value)
+        except (KeyError, ValueError):
+            continue
+        OrganizationKeys.objects.filter(pk=key.pk).update(thumbprint=thumbprint)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0003_alter_organizationkeys_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organizationkeys',
+            name='thumbprint',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, verbose_name='JWK Thumbprint'),
+        ),
+        migrations.RunPython(fill_thumbprints, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,7 @@ import uuid
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from common.utils.crypto_utils import calculate_jwk_thumbprint
 from organizations.enums import FormatEnum, TypeEnum
 
 
@@ -29,6 +30,9 @@ class OrganizationKeys(models.Model):
         help_text=_("Add here you Private Key or your information"),
         default=dict,
     )
+    thumbprint = models.CharField(
+        _("JWK Thumbprint"), max_length=100, null=True, blank=True, editable=False
+    )
 
     class Meta:
         verbose_name = _("Organization Keys")
@@ -36,3 +40,10 @@ class OrganizationKeys(models.Model):
 
     def __str__(self) -> str:
         return f"{self.name}"
+
+    def save(self, *args, **kwargs):
+        try:
+            self.thumbprint = calculate_jwk_thumbprint(self.value)
+        except (KeyError, ValueError):
+            self.thumbprint = None
+        return super().save(*args, **kwargs)
@@ -4,10 +4,11 @@ import os
 from channels.routing import ProtocolTypeRouter
 from django.core.asgi import get_asgi_application
 
-django_asgi_app = get_asgi_application()
-
+# Must be set before the application (and so the settings) is loaded
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
 
+django_asgi_app = get_asgi_application()
+
 application = ProtocolTypeRouter(
     {
         "http": django_asgi_app,
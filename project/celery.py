@@ -1,8 +1,16 @@
 from __future__ import absolute_import, unicode_literals
 
 import os
+import shutil
+import time
 
 from celery import Celery
+from celery.signals import (
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_shutdown,
+)
 
 from .settings import CELERY_BROKER_URL
 
@@ -11,3 +19,49 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
 app = Celery("project", broker=os.environ.get(CELERY_BROKER_URL))
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+
+# Start time of the tasks running in this process, by task id
+_task_starts = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, **kwargs):
+    _task_starts[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def observe_task_duration(task_id=None, task=None, state=None, **kwargs):
+    from common.utils.metrics_utils import CELERY_TASK_DURATION
+
+    start = _task_starts.pop(task_id, None)
+    if start is not None:
+        CELERY_TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(
+            time.perf_counter() - start
+        )
+
+
+@worker_init.connect
+def start_metrics_exporter(**kwargs):
+    from django.conf import settings
+    from prometheus_client import start_http_server
+
+    from common.utils.metrics_utils import registry
+
+    # Tasks run in the pool processes: without the directory they share their
+    # samples through, this process would only export empty metrics
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not settings.CELERY_METRICS_PORT or not multiproc_dir:
+        return
+    # Samples of a previous run of the worker must not be added up
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir)
+    start_http_server(settings.CELERY_METRICS_PORT, registry=registry())
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid or os.getpid())
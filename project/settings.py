@@ -100,6 +100,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "common.middleware.metrics_middleware.MetricsMiddleware",
+    "common.middleware.upstream_error_middleware.UpstreamErrorMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -153,6 +155,33 @@ if database_url:
 
     DATABASES["default"] = dj_database_url.parse(database_url)
 
+# Seconds a connection is kept open between requests (0 = one per request).
+# Daphne runs the ORM in executor threads and each thread keeps its own
+# persistent connection, so prefer DB_POOL when serving through ASGI.
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", 0))
+# Check a persistent connection before reusing it for a new request
+DB_CONN_HEALTH_CHECKS = readEnvBool("DB_CONN_HEALTH_CHECKS", False)
+# psycopg 3 connection pool shared by all the threads of a process
+DB_POOL = readEnvBool("DB_POOL", False)
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", 2))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", 10))
+# Seconds to wait for a free pooled connection before failing
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = DB_CONN_HEALTH_CHECKS
+if DB_POOL:
+    # Connections go back to the pool when Django closes them, so they must
+    # not be persistent as well. Django makes the pool check every connection
+    # before handing it out.
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "min_size": DB_POOL_MIN_SIZE,
+        "max_size": DB_POOL_MAX_SIZE,
+        "timeout": DB_POOL_TIMEOUT,
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = DB_CONN_MAX_AGE
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -196,6 +225,14 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 CELERY_BROKER_URL = os.environ.get("REDIS_URL", "redis://redis:6379/0")
 
+# Shared by every worker, so cached documents are built once per deployment
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("CACHE_URL", "redis://redis:6379/1"),
+    }
+}
+
 
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
 EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER", "")
@@ -238,15 +275,26 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Share of the requests and Celery tasks traced by Sentry (0 to 1)
+SENTRY_TRACES_SAMPLE_RATE = float(os.environ.get("SENTRY_TRACES_SAMPLE_RATE", 0.1))
+# Share of the metadata, JWKS and status list requests traced by Sentry
+SENTRY_METADATA_TRACES_SAMPLE_RATE = float(
+    os.environ.get("SENTRY_METADATA_TRACES_SAMPLE_RATE", 0.01)
+)
+
 if not DEBUG:
+    from common.utils.sentry_utils import traces_sampler
+
     sentry_sdk.init(
         dsn=os.environ.get("SENTRY_DSN", ""),
         environment=DJANGO_ENVIRONMENT,
-        traces_sample_rate=1.0,
+        traces_sampler=traces_sampler,
         send_default_pii=True,
     )
     SECURE_SSL_REDIRECT = True
     SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
+    # Prometheus scrapes the workers directly, without TLS
+    SECURE_REDIRECT_EXEMPT = [r"^metrics$"]
 
 
 SIMPLE_JWT = {
@@ -423,7 +471,45 @@ VC_SERVICE_URL = os.environ.get("VC_SERVICE_URL", "")
 DID = os.environ.get("DID", "")
 ENTITY_URL = os.environ.get("ENTITY_URL", "")
 ENTITY_API_KEY = os.environ.get("ENTITY_API_KEY", "")
+# Entity authentication: an API key or a JSON object (see EntityAuthCredentials)
+ENTITY_AUTH = os.environ.get("ENTITY_AUTH", "")
+# Whether the TLS certificate of the entity is verified
+ENTITY_VERIFY_SSL = not readEnvBool("ENTITY_INSECURE_SSL", False)
+# Dotted path of the EntityConnector used instead of the HTTP (or mock) one
+ENTITY_CONNECTOR_CLASS = os.environ.get("ENTITY_CONNECTOR_CLASS", "")
 APPEND_SLASH = os.environ.get("APPEND_SLASH", "False")
+# Seconds before expiry an entity OAuth2 token is refreshed, and lifetime
+# assumed for tokens without "expires_in"
+ENTITY_TOKEN_REFRESH_MARGIN = int(os.environ.get("ENTITY_TOKEN_REFRESH_MARGIN", 60))
+ENTITY_TOKEN_DEFAULT_TTL = int(os.environ.get("ENTITY_TOKEN_DEFAULT_TTL", 300))
+
+# Pooled keep-alive connections and timeouts (seconds) for upstream services
+UPSTREAM_HTTP_POOL_CONNECTIONS = int(os.environ.get("UPSTREAM_HTTP_POOL_CONNECTIONS", 10))
+UPSTREAM_HTTP_POOL_SIZE = int(os.environ.get("UPSTREAM_HTTP_POOL_SIZE", 50))
+UPSTREAM_HTTP_CONNECT_TIMEOUT = float(
+    os.environ.get("UPSTREAM_HTTP_CONNECT_TIMEOUT", 3.05)
+)
+UPSTREAM_HTTP_READ_TIMEOUT = float(os.environ.get("UPSTREAM_HTTP_READ_TIMEOUT", 30))
+# Consecutive failures that open the circuit of an upstream, and seconds it
+# stays open before a probe call is let through
+UPSTREAM_CIRCUIT_FAILURE_THRESHOLD = int(
+    os.environ.get("UPSTREAM_CIRCUIT_FAILURE_THRESHOLD", 5)
+)
+UPSTREAM_CIRCUIT_RESET_TIMEOUT = float(
+    os.environ.get("UPSTREAM_CIRCUIT_RESET_TIMEOUT", 30)
+)
+# Calls in flight to each upstream per process before new ones are rejected (0: no limit)
+UPSTREAM_MAX_CONCURRENCY = int(os.environ.get("UPSTREAM_MAX_CONCURRENCY", 20))
+# Limits of specific upstreams instead of UPSTREAM_MAX_CONCURRENCY, e.g.
+# "entity=5,vc_service=40"
+UPSTREAM_MAX_CONCURRENCY_OVERRIDES = {
+    upstream.strip(): int(limit)
+    for upstream, limit in (
+        item.split("=", 1)
+        for item in readEnvList("UPSTREAM_MAX_CONCURRENCY_OVERRIDES", [])
+        if item.strip()
+    )
+}
 
 EBSI_DIDR_URL = os.environ.get(
     "EBSI_DIDR_URL", "https://api-pilot.ebsi.eu/did-registry/v5/identifiers"
@@ -435,6 +521,106 @@ EBSI_TIR_URL = os.environ.get(
 
 DEVELOPER_MOCKUP_ENTITIES = readEnvBool("DEVELOPER_MOCKUP_ENTITIES", False)
 
+# StatusList2021 indices reserved at once by each worker process
+STATUS_LIST_BLOCK_SIZE = int(os.environ.get("STATUS_LIST_BLOCK_SIZE", 16))
+# StatusList2021 lists open in parallel to spread allocation and revocation writes
+STATUS_LIST_SHARDS = int(os.environ.get("STATUS_LIST_SHARDS", 1))
+# Seconds a signed status list credential is reused for and may be cached by verifiers
+STATUS_LIST_CREDENTIAL_TTL = int(os.environ.get("STATUS_LIST_CREDENTIAL_TTL", 3600))
+STATUS_LIST_CACHE_MAX_AGE = int(os.environ.get("STATUS_LIST_CACHE_MAX_AGE", 60))
+# Calls sent at once in a JSON-RPC batch array to the VC Service
+RPC_BATCH_SIZE = int(os.environ.get("RPC_BATCH_SIZE", 50))
+# Seconds single calls are sent to an RPC endpoint that rejected a batch
+# array, before trying a batch again
+RPC_BATCH_RETRY_INTERVAL = int(os.environ.get("RPC_BATCH_RETRY_INTERVAL", 600))
+# EBSI accreditations revoked in parallel by a bulk revocation when the VC
+# Service does not support JSON-RPC batches
+EBSI_REVOCATION_WORKERS = int(os.environ.get("EBSI_REVOCATION_WORKERS", 8))
+# Seconds the credential issuer metadata document is cached between invalidations
+ISSUER_METADATA_CACHE_TTL = int(os.environ.get("ISSUER_METADATA_CACHE_TTL", 3600))
+# Seconds the VC Service authorization server metadata is reused before revalidating
+AUTHORIZATION_SERVER_METADATA_CACHE_TTL = int(
+    os.environ.get("AUTHORIZATION_SERVER_METADATA_CACHE_TTL", 300)
+)
+# Seconds the external data of a white listed accreditation (and the attribute
+# reserved for it in the TIR) is reused before being built again
+ACCREDITATION_EXTERNAL_DATA_CACHE_TTL = int(
+    os.environ.get("ACCREDITATION_EXTERNAL_DATA_CACHE_TTL", 86400)
+)
+# Seconds a DID that is not white listed is remembered as such
+ACCREDITATION_EXTERNAL_DATA_NEGATIVE_CACHE_TTL = int(
+    os.environ.get("ACCREDITATION_EXTERNAL_DATA_NEGATIVE_CACHE_TTL", 60)
+)
+# Max-age (seconds) verifiers may cache the JWKS for
+JWKS_CACHE_MAX_AGE = int(os.environ.get("JWKS_CACHE_MAX_AGE", 300))
+# Default QR rendering options, overridable per request
+QR_BOX_SIZE = int(os.environ.get("QR_BOX_SIZE", 8))
+QR_BORDER = int(os.environ.get("QR_BORDER", 5))
+QR_ERROR_CORRECTION = os.environ.get("QR_ERROR_CORRECTION", "M")
+QR_MAX_BOX_SIZE = int(os.environ.get("QR_MAX_BOX_SIZE", 20))
+# Rendered QR images kept in memory by each worker process
+QR_RENDER_CACHE_SIZE = int(os.environ.get("QR_RENDER_CACHE_SIZE", 256))
+# Seconds a nonce stays valid unless its creator sets "expires_at"
+NONCE_TTL = int(os.environ.get("NONCE_TTL", 3600))
+# Where nonces are kept: "database" or "redis" (native TTLs and GETDEL)
+NONCE_STORE = os.environ.get("NONCE_STORE", "database")
+NONCE_REDIS_URL = os.environ.get("NONCE_REDIS_URL", "redis://redis:6379/2")
+# Expired nonces deleted per query, and seconds between purges (Celery beat)
+NONCE_PURGE_BATCH_SIZE = int(os.environ.get("NONCE_PURGE_BATCH_SIZE", 1000))
+NONCE_PURGE_INTERVAL = int(os.environ.get("NONCE_PURGE_INTERVAL", 300))
+# Entity "external-data" notifications sent per batch by the outbox drainer
+ENTITY_NOTIFICATION_BATCH_SIZE = int(
+    os.environ.get("ENTITY_NOTIFICATION_BATCH_SIZE", 100)
+)
+# Delivery attempts before a notification is left undelivered
+ENTITY_NOTIFICATION_MAX_ATTEMPTS = int(
+    os.environ.get("ENTITY_NOTIFICATION_MAX_ATTEMPTS", 10)
+)
+# Seconds before the first retry, doubled after every failed attempt
+ENTITY_NOTIFICATION_RETRY_DELAY = int(
+    os.environ.get("ENTITY_NOTIFICATION_RETRY_DELAY", 30)
+)
+# Seconds a drainer holds the notifications it is sending before another
+# one may retry them
+ENTITY_NOTIFICATION_LEASE = int(os.environ.get("ENTITY_NOTIFICATION_LEASE", 300))
+# Seconds delivered notifications are kept, deleted per query, and seconds
+# between purges (Celery beat)
+ENTITY_NOTIFICATION_RETENTION = int(
+    os.environ.get("ENTITY_NOTIFICATION_RETENTION", 7 * 24 * 3600)
+)
+ENTITY_NOTIFICATION_PURGE_BATCH_SIZE = int(
+    os.environ.get("ENTITY_NOTIFICATION_PURGE_BATCH_SIZE", 1000)
+)
+ENTITY_NOTIFICATION_PURGE_INTERVAL = int(
+    os.environ.get("ENTITY_NOTIFICATION_PURGE_INTERVAL", 3600)
+)
+# Entity endpoint receiving a whole batch of notifications as a JSON array
+# (one request per notification if empty)
+ENTITY_NOTIFICATION_BATCH_PATH = os.environ.get("ENTITY_NOTIFICATION_BATCH_PATH", "")
+# Seconds between two runs of the outbox drainer (Celery beat)
+ENTITY_NOTIFICATION_INTERVAL = int(os.environ.get("ENTITY_NOTIFICATION_INTERVAL", 60))
+# Bearer token Prometheus must send to read /metrics (if empty, it is only
+# open with DEBUG)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Port the Celery worker exports its task metrics on (0 disables it). Only
+# used when PROMETHEUS_MULTIPROC_DIR is set
+CELERY_METRICS_PORT = int(os.environ.get("CELERY_METRICS_PORT", 9808))
+
+CELERY_BEAT_SCHEDULE = {
+    "deliver-entity-notifications": {
+        "task": "credentials.tasks.deliver_entity_notifications",
+        "schedule": ENTITY_NOTIFICATION_INTERVAL,
+    },
+    "purge-delivered-entity-notifications": {
+        "task": "credentials.tasks.purge_delivered_entity_notifications",
+        "schedule": ENTITY_NOTIFICATION_PURGE_INTERVAL,
+    },
+    "purge-expired-nonces": {
+        "task": "openid.tasks.purge_expired_nonces",
+        "schedule": NONCE_PURGE_INTERVAL,
+    },
+}
+
 # Local Settings
 try:
     from .settings_local import *
@@ -20,6 +20,7 @@ if database_url:
     DATABASES["default"] = dj_database_url.parse(database_url, conn_max_age=600)
 
 STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
 DEBUG = True
 
 SECURE_SSL_REDIRECT = False
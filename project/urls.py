@@ -1,5 +1,8 @@
+import hmac
+
 from django.contrib import admin
 from django.contrib.auth import views as auth_views
+from django.http import HttpResponse
 from django.shortcuts import redirect, render
 from django.urls import include, path, re_path
 from django.utils.translation import gettext_lazy as _
@@ -8,9 +11,10 @@ from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
 import project.custom_admin as custom_admin  # noqa: F401
+from common.utils import metrics_utils
 from user.views import LoginViewCustom
 
-from .settings import BACKEND_DOMAIN
+from .settings import BACKEND_DOMAIN, DEBUG, METRICS_TOKEN
 
 
 def f_400(request, exception):
@@ -29,6 +33,18 @@ def f_500(request):
     return render(request, "error_templates/500.html", {})
 
 
+def metrics(request):
+    if METRICS_TOKEN:
+        authorization = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(authorization, f"Bearer {METRICS_TOKEN}"):
+            return HttpResponse(status=401)
+    elif not DEBUG:
+        # Only open without a token in development
+        return HttpResponse(status=403)
+    content, content_type = metrics_utils.export()
+    return HttpResponse(content, content_type=content_type)
+
+
 handler403 = f_400
 handler403 = f_403
 handler404 = f_404
@@ -110,6 +126,7 @@ urlpatterns = [
         schema_view.with_ui("redoc", cache_timeout=0),
         name="schema-redoc",
     ),
+    path("metrics", metrics, name="metrics"),
     path("admin/", admin.site.urls),
     path("", lambda x: redirect("admin/")),
 ]
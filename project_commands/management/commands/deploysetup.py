@@ -4,12 +4,27 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from django.core.management.base import BaseCommand
+from django.db import connection
+
+# Arbitrary key of the advisory lock that serialises concurrent setups
+DEPLOY_SETUP_LOCK = 8000
 
 
 class Command(BaseCommand):
     help = "The functional/simpliest way to create a superuser"
 
     def handle(self, *args, **options):
+        # Replicas started at the same time run the setup one after the other,
+        # the later ones find the migrations already applied
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s)", [DEPLOY_SETUP_LOCK])
+        try:
+            self.setup()
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [DEPLOY_SETUP_LOCK])
+
+    def setup(self):
         for path in settings.LOCALE_PATHS:
             if not os.path.exists(path):
                 os.mkdir(path)
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from common.error.revocation_error import InvalidRevocationEntryError
+from credentials.services.revocation_service import RevocationService
+
+
+class Command(BaseCommand):
+    help = "Revoke issued credentials in bulk, one status list update per list"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--vc-id",
+            action="append",
+            dest="vc_ids",
+            default=[],
+            help="VC Identifier to revoke, may be repeated",
+        )
+        parser.add_argument("--holder", help="Revoke every VC issued to this DID")
+        parser.add_argument("--vc-type", help="Revoke every VC of this type")
+
+    def handle(self, *args, **options):
+        vc_ids = options["vc_ids"]
+        holder = options["holder"]
+        vc_type = options["vc_type"]
+        if not vc_ids and not holder and not vc_type:
+            raise CommandError("At least one of --vc-id, --holder or --vc-type is required")
+
+        def progress(label, revoked, total):
+            self.stdout.write(f"{label}: {revoked}/{total} revoked")
+
+        try:
+            result = RevocationService.revoke(
+                RevocationService.targets(vc_ids, holder, vc_type), progress
+            )
+        except InvalidRevocationEntryError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"Revoked {result['revoked']} of {result['total']} credentials")
+        for vc_id in result["failed"]:
+            self.stderr.write(f"Failed to revoke {vc_id}")